@@ -1,9 +1,19 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, Response, stream_with_context
 from flask_login import login_required, current_user
 from rewear_ai.wardrobe.models import Charity, DonationRecord, User, ClothingItem
 from rewear_ai.app import db
+from rewear_ai.services.admission import controller as ai_admission
+from rewear_ai.services import bulk, reports
+from rewear_ai.services.db_routing import read_only_blueprint
 
 admin_bp = Blueprint('admin', __name__, template_folder='templates')
+# Admin pages are reports over the whole site: every GET may use the replica
+read_only_blueprint(admin_bp)
+
+REPORT_FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
 
 @admin_bp.route('/dashboard')
 @login_required
@@ -17,7 +27,7 @@ def dashboard():
     total_users = User.query.count()
     total_donations = DonationRecord.query.count()
     total_clothes = ClothingItem.query.count()
-    verified_charities = Charity.query.all()
+    verified_charities = Charity.query.filter_by(source='partner').all()
     
     return render_template('admin/dashboard.html', 
                            users=total_users, 
@@ -41,4 +51,50 @@ def add_charity():
     db.session.commit()
     
     flash(f"Successfully added {name} to the verified list!", "success")
-    return redirect(url_for('admin.dashboard'))
\ No newline at end of file
+    return redirect(url_for('admin.dashboard'))
+
+@admin_bp.route('/ai-metrics')
+@login_required
+def ai_metrics():
+    """Admission-control counters for Gemini calls in this worker."""
+    if not current_user.is_admin:
+        return jsonify({"error": "Admin only"}), 403
+    return jsonify(ai_admission.snapshot())
+
+# 📌 DONATION HISTORY EXPORT (streams CSV / JSONL, filtered by date, charity, category)
+@admin_bp.route('/reports/donations.<fmt>')
+@login_required
+def export_donations(fmt):
+    if not current_user.is_admin:
+        return jsonify({"error": "Admin only"}), 403
+    if fmt not in REPORT_FORMATS:
+        return jsonify({"error": "Format must be csv or jsonl"}), 400
+    try:
+        clauses = reports.donation_filters(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    fields = reports.DONATION_FIELDS
+    rows = bulk.stream_rows(reports.donation_rows(clauses), fields)
+    body = bulk.to_csv(rows, fields) if fmt == 'csv' else bulk.to_jsonl(rows)
+
+    return Response(
+        stream_with_context(body),
+        mimetype=REPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f"attachment; filename=donations.{fmt}"}
+    )
+
+# 📌 DONATION TOTALS (per charity and per month, aggregated in SQL)
+@admin_bp.route('/reports/donation-totals')
+@login_required
+def donation_totals():
+    if not current_user.is_admin:
+        return jsonify({"error": "Admin only"}), 403
+    try:
+        clauses = reports.donation_filters(request.args)
+        groupings = [request.args['by']] if request.args.get('by') else ['charity', 'month']
+        return jsonify({
+            f"by_{by}": reports.donation_totals(clauses, by) for by in groupings
+        })
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
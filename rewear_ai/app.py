@@ -1,10 +1,12 @@
 import os
 from flask import Flask
 from sqlalchemy import MetaData
+from sqlalchemy.engine import make_url
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_login import LoginManager
 from dotenv import load_dotenv
+from rewear_ai.services.db_routing import RoutingSession, configure_replica
 
 # Load environment variables from .env
 load_dotenv()
@@ -18,7 +20,7 @@ convention = {
 }
 
 metadata = MetaData(naming_convention=convention)
-db = SQLAlchemy(metadata=metadata)
+db = SQLAlchemy(metadata=metadata, session_options={'class_': RoutingSession})
 migrate = Migrate() 
 login_manager = LoginManager()
 
@@ -42,18 +44,55 @@ def create_app():
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['SESSION_PERMANENT'] = False
 
+    # --- SQLITE PRODUCTION MODE (WAL, pragmas, single writer, read-only bind) ---
+    sqlite_path = None
+    url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() == 'sqlite' and url.database and url.database != ':memory:':
+        from rewear_ai.services import sqlite_mode
+        sqlite_path = os.path.abspath(url.database)
+        sqlite_mode.configure(app, sqlite_path)
+
+    # --- READ REPLICA (optional; read-only routes query it instead of the primary) ---
+    replica_url = os.getenv('DATABASE_REPLICA_URL')
+    if replica_url:
+        configure_replica(app, replica_url)
+        print("DATABASE: Read-only routes use the replica...")
+
     # Initialize Extensions
     db.init_app(app) 
+    if sqlite_path:
+        sqlite_mode.install(app, db)
     migrate.init_app(app, db, render_as_batch=True)
     
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
     login_manager.login_message_category = 'info'
 
+    from rewear_ai.services import passwords
+    passwords.init_app(app)
+
+    from rewear_ai.services import fragment_cache
+    fragment_cache.init_app(app)
+
+    from rewear_ai.services import conditional
+    conditional.init_app(app)
+
+    from rewear_ai.services import stats
+    stats.init_app(app)
+
+    from rewear_ai.services import outfits
+    outfits.init_app(app)
+
+    from rewear_ai.services import features
+    features.init_app(app)
+
+    from rewear_ai.services import osm
+    osm.init_app(app)
+
     # --- THE CRITICAL FIX: IMPORT CORRECT MODEL NAMES ---
     with app.app_context():
         # Match these to your wardrobe/models.py
-        from rewear_ai.wardrobe.models import User, ClothingItem, Charity, DonationRecord
+        from rewear_ai.wardrobe.models import User, ClothingItem, Charity, DonationRecord, UserStats, OutfitSuggestion
         
         # This creates ALL tables in your PostgreSQL database
         db.create_all()
@@ -61,8 +100,37 @@ def create_app():
 
     @login_manager.user_loader
     def load_user(user_id):
+        # Served from the per-worker cache when the session stamp still matches,
+        # so authenticated requests don't hit the users table just for current_user.
+        # Changes made in another worker show up here once the entry expires
+        # (USER_CACHE_TTL, see services/user_cache.py)
+        from flask import session
         from rewear_ai.wardrobe.models import User
-        return db.session.get(User, int(user_id))
+        from rewear_ai.services.user_cache import user_cache, CachedUser
+
+        user_id = int(user_id)
+        stamp = session.get('auth_version')
+
+        cached = user_cache.get(user_id)
+        if cached and cached.auth_version == stamp:
+            return cached
+
+        user = db.session.get(User, user_id)
+        if user is None:
+            user_cache.invalidate(user_id)
+            return None
+
+        cached = CachedUser.from_user(user)
+        if stamp is None:
+            # Session from before version stamps existed: adopt the current one
+            session['auth_version'] = cached.auth_version
+        elif stamp != cached.auth_version:
+            # Password or role changed since this session logged in
+            user_cache.invalidate(user_id)
+            return None
+
+        user_cache.put(cached)
+        return cached
 
     # --- Register Blueprints ---
     from rewear_ai.wardrobe.routes import wardrobe
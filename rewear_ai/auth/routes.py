@@ -1,7 +1,9 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import Blueprint, render_template, redirect, url_for, flash, request, session
 from flask_login import login_user, logout_user, login_required, current_user
 from rewear_ai.wardrobe.models import User
 from rewear_ai.app import db
+from rewear_ai.services.user_cache import user_cache, CachedUser
+from rewear_ai.services.passwords import HashingBusy
 
 auth = Blueprint('auth', __name__, template_folder='templates')
 
@@ -31,7 +33,11 @@ def register():
 
         # Create the user
         new_user = User(username=username, email=email)
-        new_user.set_password(password)
+        try:
+            new_user.set_password(password)
+        except HashingBusy:
+            flash('We are busy right now. Please try again in a moment.', 'warning')
+            return redirect(url_for('auth.register'))
         
         # LOGIC: First user is Admin, others are standard users
         if User.query.count() == 0:
@@ -54,9 +60,27 @@ def login():
         email = request.form.get('email')
         password = request.form.get('password')
         user = User.query.filter_by(email=email).first()
-        
-        if user and user.check_password(password):
+
+        try:
+            valid = user is not None and user.check_password(password)
+        except HashingBusy:
+            flash('We are busy right now. Please try again in a moment.', 'warning')
+            return render_template('auth/login.html')
+
+        if valid:
+            # Upgrade hashes made under an older policy while we have the password
+            if user.password_needs_rehash():
+                try:
+                    user.rehash_password(password)
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Rehash Error: {e}")
+
             login_user(user)
+            # Stamp the session so cached logins go stale on password/role changes
+            session['auth_version'] = user.auth_version
+            user_cache.put(CachedUser.from_user(user))
             # Redirect to Admin Dashboard if Admin, else Wardrobe
             if user.is_admin:
                 return redirect(url_for('admin.dashboard'))
@@ -70,4 +94,5 @@ def login():
 @login_required
 def logout():
     logout_user()
+    session.pop('auth_version', None)
     return redirect(url_for('auth.login'))
\ No newline at end of file
@@ -1,14 +1,47 @@
+import os
 import requests
 from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for
 from flask_login import login_required, current_user
+from datetime import datetime
+from sqlalchemy import select, insert, delete, func
 from rewear_ai.wardrobe.models import ClothingItem, Charity, DonationRecord
+from rewear_ai.wardrobe.routes import remove_upload
+from rewear_ai.services import fragment_cache, stats, osm
+from rewear_ai.services.conditional import conditional, make_etag, time_bucket
+from rewear_ai.services.db_routing import read_only
 from rewear_ai.app import db
 
 donate = Blueprint('donate', __name__, template_folder='templates')
 
+# OSM results are treated as fresh for this long
+NEARBY_WINDOW = 900
+
+# 'auto' answers from ingested OSM data when there is any, else asks Overpass;
+# 'local' never calls out, 'overpass' always does
+CHARITY_SOURCE = os.getenv('CHARITY_SOURCE', 'auto')
+
+def _nearby_etag():
+    # Partners are only ever added through the admin panel (new highest id).
+    # OSM rows change only through ingestion: upserts stamp ingested_at, and
+    # deletes change the OSM row count
+    versions = db.session.execute(
+        select(
+            func.count(Charity.id).filter(Charity.source == 'partner'),
+            func.max(Charity.id),
+            func.count(Charity.id).filter(Charity.source == 'osm'),
+            func.max(Charity.ingested_at),
+        )
+    ).one()
+    return make_etag(
+        'nearby', request.args.get('lat'), request.args.get('lon'),
+        *versions, time_bucket(NEARBY_WINDOW)
+    )
+
 # --- GLOBAL API SEARCH (Overpass API for Nearby Charities) ---
 @donate.route('/api/nearby')
+@read_only
 @login_required
+@conditional(_nearby_etag, weak=True, cache_control=f'private, max-age={NEARBY_WINDOW}')
 def nearby_charities():
     lat = request.args.get('lat')
     lon = request.args.get('lon')
@@ -17,13 +50,25 @@ def nearby_charities():
     results = []
     try:
         # 1. Start with verified partners from our own Database
-        local_db_partners = Charity.query.all()
+        local_db_partners = Charity.query.filter_by(source='partner').all()
         results = [c.to_dict() for c in local_db_partners]
     except Exception as e:
         print(f"Database Fetch Error: {e}")
 
-    # 2. Add real-world data from OpenStreetMap (Overpass API)
-    if lat and lon:
+    use_local = CHARITY_SOURCE == 'local' or (CHARITY_SOURCE == 'auto' and osm.has_local_data())
+
+    # 2a. Real-world data from our ingested OpenStreetMap copy (no network)
+    if lat and lon and use_local:
+        try:
+            for entry in osm.nearby_local(float(lat), float(lon), radius / 1000):
+                if any(r['name'].lower() == entry['name'].lower() for r in results):
+                    continue
+                results.append(entry)
+        except ValueError:
+            return jsonify({"error": "Invalid coordinates"}), 400
+
+    # 2b. Add real-world data from OpenStreetMap (Overpass API)
+    elif lat and lon:
         overpass_url = "https://overpass-api.de/api/interpreter"
         overpass_query = f"""
         [out:json][timeout:25];
@@ -109,6 +154,9 @@ def log_donation(item_id):
         # 🛡️ THE SUSTAINABLE ACTION: Delete from closet only if it came from the wardrobe
         if item:
             db.session.delete(item) 
+            fragment_cache.bump_wardrobe_version(current_user.id)
+        stats.record(current_user.id, items_removed=[item] if item else (),
+                     donations=1, impact=new_record.impact_score)
         
         db.session.commit()
         
@@ -121,7 +169,97 @@ def log_donation(item_id):
         flash("Could not process donation. Please try again.", "danger")
         return redirect(url_for('donate.index', item_id=item_id))
 
+@donate.route('/log-batch', methods=['POST'])
+@login_required
+def log_batch_donation():
+    """
+    Donates several wardrobe items at once.
+    Ownership check, record inserts and item deletes share one transaction,
+    so the number of round trips doesn't grow with the number of items.
+    """
+    def fail(message, status):
+        if request.is_json:
+            return jsonify({"error": message}), status
+        flash(message, "danger")
+        return redirect(url_for('wardrobe.index'))
+
+    if request.is_json:
+        payload = request.get_json(silent=True)
+        if not isinstance(payload, dict):
+            return fail("Expected a JSON object with item_ids.", 400)
+        raw_ids = payload.get('item_ids') or []
+        # A string would be iterated digit by digit; only accept a list of ints
+        if not isinstance(raw_ids, list) or not all(
+            isinstance(i, int) and not isinstance(i, bool) for i in raw_ids
+        ):
+            return fail("item_ids must be a list of item ids.", 400)
+        item_ids = set(raw_ids)
+        selected_home = payload.get('charity_name')
+        if not isinstance(selected_home, str) or not selected_home:
+            selected_home = 'Local Community Center'
+    else:
+        try:
+            item_ids = {int(i) for i in request.form.getlist('item_ids')}
+        except ValueError:
+            return fail("Select at least one item to donate.", 400)
+        selected_home = request.form.get('charity_name', 'Local Community Center')
+
+    if not item_ids:
+        return fail("Select at least one item to donate.", 400)
+
+    # One query verifies ownership of every item
+    items = db.session.execute(
+        select(ClothingItem.id, ClothingItem.name, ClothingItem.category, ClothingItem.season,
+               ClothingItem.times_worn, ClothingItem.image_file)
+        .where(ClothingItem.id.in_(item_ids), ClothingItem.user_id == current_user.id)
+    ).all()
+    if len(items) != len(item_ids):
+        return fail("Some items were not found in your wardrobe.", 404)
+
+    now = datetime.utcnow()
+    records = [{
+        "item_name": item.name,
+        "category": item.category,
+        "charity_name": selected_home,
+        "date_donated": now,
+        "impact_score": 15,
+        "user_id": current_user.id,
+    } for item in items]
+
+    try:
+        db.session.execute(insert(DonationRecord), records)
+        db.session.execute(
+            delete(ClothingItem)
+            .where(ClothingItem.id.in_(item_ids), ClothingItem.user_id == current_user.id)
+            .execution_options(synchronize_session=False)
+        )
+        stats.record(current_user.id, items_removed=items, donations=len(records),
+                     impact=sum(r["impact_score"] for r in records))
+        fragment_cache.bump_wardrobe_version(current_user.id)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Batch Donation Error: {e}")
+        return fail("Could not process donation. Please try again.", 500)
+
+    # Files go only once the rows are gone for good
+    for item in items:
+        remove_upload(item.image_file)
+
+    summary = {
+        "donated": len(items),
+        "charity_name": selected_home,
+        "impact_score": sum(r["impact_score"] for r in records),
+    }
+    if request.is_json:
+        return jsonify(summary)
+
+    flash(f"Amazing! You've donated {summary['donated']} items to {selected_home} "
+          f"(+{summary['impact_score']} impact points).", "success")
+    return redirect(url_for('wardrobe.index'))
+
 @donate.route('/success/<int:record_id>')
+@read_only
 @login_required
 def donation_success(record_id):
     """Celebration page to show the impact of the donation."""
@@ -0,0 +1,26 @@
+"""Add auth_version to users
+
+Revision ID: 3c1d7e9a4b20
+Revises: 10af6f0618f5
+Create Date: 2026-10-19 09:12:41.118203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c1d7e9a4b20'
+down_revision = '10af6f0618f5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('auth_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('auth_version')
@@ -0,0 +1,26 @@
+"""Add wardrobe_version to users
+
+Revision ID: 5e8a2f4c7d13
+Revises: 3c1d7e9a4b20
+Create Date: 2026-10-19 11:03:27.540918
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e8a2f4c7d13'
+down_revision = '3c1d7e9a4b20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('wardrobe_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('wardrobe_version')
@@ -0,0 +1,38 @@
+"""Add user_stats rollup
+
+Revision ID: 8b47d1e0c6a5
+Revises: 5e8a2f4c7d13
+Create Date: 2026-10-19 13:40:52.207316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b47d1e0c6a5'
+down_revision = '5e8a2f4c7d13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # create_app() runs db.create_all() before migrations, so the table may
+    # already exist by the time `flask db upgrade` gets here
+    if sa.inspect(op.get_bind()).has_table('user_stats'):
+        return
+    op.create_table('user_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('total_wears', sa.Integer(), nullable=False),
+    sa.Column('item_count', sa.Integer(), nullable=False),
+    sa.Column('items_by_category', sa.JSON(), nullable=False),
+    sa.Column('items_by_season', sa.JSON(), nullable=False),
+    sa.Column('donation_count', sa.Integer(), nullable=False),
+    sa.Column('impact_score', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], name=op.f('fk_user_stats_user_id_users')),
+    sa.PrimaryKeyConstraint('user_id', name=op.f('pk_user_stats'))
+    )
+
+
+def downgrade():
+    op.drop_table('user_stats')
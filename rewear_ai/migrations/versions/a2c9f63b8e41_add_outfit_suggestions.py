@@ -0,0 +1,37 @@
+"""Add precomputed outfit_suggestions
+
+Revision ID: a2c9f63b8e41
+Revises: 8b47d1e0c6a5
+Create Date: 2026-10-19 15:21:09.884730
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a2c9f63b8e41'
+down_revision = '8b47d1e0c6a5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # create_app() runs db.create_all() before migrations, so the table may
+    # already exist by the time `flask db upgrade` gets here
+    if sa.inspect(op.get_bind()).has_table('outfit_suggestions'):
+        return
+    op.create_table('outfit_suggestions',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('occasion', sa.String(length=50), nullable=False),
+    sa.Column('temp_band', sa.String(length=10), nullable=False),
+    sa.Column('wardrobe_version', sa.Integer(), nullable=False),
+    sa.Column('cursor', sa.Integer(), nullable=False),
+    sa.Column('outfits', sa.JSON(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], name=op.f('fk_outfit_suggestions_user_id_users')),
+    sa.PrimaryKeyConstraint('user_id', 'occasion', 'temp_band', name=op.f('pk_outfit_suggestions'))
+    )
+
+
+def downgrade():
+    op.drop_table('outfit_suggestions')
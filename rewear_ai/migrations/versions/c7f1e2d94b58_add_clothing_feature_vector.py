@@ -0,0 +1,26 @@
+"""Add feature_vector to clothing_items
+
+Revision ID: c7f1e2d94b58
+Revises: a2c9f63b8e41
+Create Date: 2026-10-19 16:48:33.612045
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7f1e2d94b58'
+down_revision = 'a2c9f63b8e41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('clothing_items', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('feature_vector', sa.LargeBinary(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('clothing_items', schema=None) as batch_op:
+        batch_op.drop_column('feature_vector')
@@ -0,0 +1,38 @@
+"""Add OSM source columns to charities
+
+Revision ID: d4b8a1c3e927
+Revises: c7f1e2d94b58
+Create Date: 2026-10-19 18:05:14.370662
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4b8a1c3e927'
+down_revision = 'c7f1e2d94b58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('charities', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('source', sa.String(length=20), nullable=False, server_default='partner'))
+        batch_op.add_column(sa.Column('osm_id', sa.BigInteger(), nullable=True))
+        batch_op.add_column(sa.Column('kind', sa.String(length=100), nullable=True))
+        batch_op.add_column(sa.Column('geo_bucket', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_charities_source'), ['source'], unique=False)
+        batch_op.create_index(batch_op.f('ix_charities_geo_bucket'), ['geo_bucket'], unique=False)
+        batch_op.create_unique_constraint(batch_op.f('uq_charities_osm_id'), ['osm_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('charities', schema=None) as batch_op:
+        batch_op.drop_constraint(batch_op.f('uq_charities_osm_id'), type_='unique')
+        batch_op.drop_index(batch_op.f('ix_charities_geo_bucket'))
+        batch_op.drop_index(batch_op.f('ix_charities_source'))
+        batch_op.drop_column('geo_bucket')
+        batch_op.drop_column('kind')
+        batch_op.drop_column('osm_id')
+        batch_op.drop_column('source')
@@ -0,0 +1,28 @@
+"""Index donation_records for admin reports
+
+Revision ID: e5a7c2f81d36
+Revises: d4b8a1c3e927
+Create Date: 2026-10-19 19:12:47.208315
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a7c2f81d36'
+down_revision = 'd4b8a1c3e927'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('donation_records', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_donation_records_date_donated'), ['date_donated'], unique=False)
+        batch_op.create_index(batch_op.f('ix_donation_records_charity_name'), ['charity_name'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('donation_records', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_donation_records_charity_name'))
+        batch_op.drop_index(batch_op.f('ix_donation_records_date_donated'))
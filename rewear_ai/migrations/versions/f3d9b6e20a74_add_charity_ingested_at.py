@@ -0,0 +1,28 @@
+"""Add ingested_at to charities
+
+Revision ID: f3d9b6e20a74
+Revises: e5a7c2f81d36
+Create Date: 2026-10-19 20:41:05.913274
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3d9b6e20a74'
+down_revision = 'e5a7c2f81d36'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('charities', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('ingested_at', sa.DateTime(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_charities_ingested_at'), ['ingested_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('charities', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_charities_ingested_at'))
+        batch_op.drop_column('ingested_at')
@@ -1,12 +1,27 @@
 import random
 import requests
+from collections import Counter
 from flask import Blueprint, render_template, request, jsonify
-from rewear_ai.wardrobe.models import ClothingItem
+from flask_login import current_user
+from rewear_ai.wardrobe.models import ClothingItem, UserStats
 from rewear_ai.app import db # Added db import for saving 'worn' stats
+from rewear_ai.services import fragment_cache, stats, outfits
+from rewear_ai.services.conditional import conditional, make_etag, time_bucket
 
 outfit = Blueprint('outfit', __name__, template_folder='templates')
 
+# Weather is refetched at most once per window per ~1km grid cell
+WEATHER_WINDOW = 600
+
+def _weather_etag():
+    lat = request.args.get('lat', type=float)
+    lon = request.args.get('lon', type=float)
+    if lat is None or lon is None:
+        return None
+    return make_etag('weather', round(lat, 2), round(lon, 2), time_bucket(WEATHER_WINDOW))
+
 @outfit.route('/api/weather')
+@conditional(_weather_etag, weak=True, cache_control=f'public, max-age={WEATHER_WINDOW}')
 def weather_api():
     """Fetches real-time weather from Open-Meteo based on browser coordinates."""
     lat = request.args.get('lat')
@@ -36,37 +51,52 @@ def dashboard():
     occasion = request.args.get('occasion', 'Casual')
     temp = request.args.get('temp', type=int)
 
-    # 🧠 AI Selection Logic
-    query = ClothingItem.query.filter_by(occasion=occasion)
-    
-    tops = query.filter_by(category='Top').all()
-    bottoms = query.filter_by(category='Bottom').all()
-    shoes = query.filter_by(category='Shoes').all()
-    
-    # Weather-Aware Layering
-    outerwear = None
-    if temp and temp < 18:
-        # Tries to find outerwear for the occasion, or just any outerwear as a fallback
-        outerwear = ClothingItem.query.filter_by(category='Outerwear', occasion=occasion).first() or \
-                    ClothingItem.query.filter_by(category='Outerwear').first()
-
+    # 🧠 AI Selection Logic: ranked outfits are precomputed per user, occasion
+    # and temperature band, so this is normally a single row lookup
     suggested_outfit = None
-    if tops and bottoms and shoes:
-        suggested_outfit = {
-            "top": random.choice(tops),
-            "bottom": random.choice(bottoms),
-            "shoes": random.choice(shoes),
-            "outerwear": outerwear
-        }
-        
+    co2_today = 0.0
+
+    if current_user.is_authenticated:
+        pick = outfits.next_outfit(current_user.id, occasion, temp)
+    else:
+        ranked = outfits.rank_outfits(None, occasion, outfits.temp_band(temp))
+        pick = random.choice(ranked) if ranked else None
+
+    if pick:
+        found = {item.id: item for item in ClothingItem.query.filter(
+            ClothingItem.id.in_([item_id for item_id in pick if item_id]))}
+        top, bottom, shoes, outerwear = (found.get(item_id) for item_id in pick)
+        if top and bottom and shoes:
+            suggested_outfit = {
+                "top": top,
+                "bottom": bottom,
+                "shoes": shoes,
+                "outerwear": outerwear
+            }
+
+    if suggested_outfit:
         # ✅ SUSTAINABILITY LOGIC: Update wear count
         # This tracks "Wardrobe Intelligence" by rewarding reuse
         for item in suggested_outfit.values():
             if item: # Check if item exists (like optional outerwear)
                 item.times_worn += 1
         
-        db.session.commit()
+        # Anonymous visitors get picks from every wardrobe, so several owners
+        # may be affected; each one's pre-bump version is needed below
+        worn = Counter(item.user_id for item in suggested_outfit.values() if item)
+        old_versions = {user_id: fragment_cache.wardrobe_version(user_id) for user_id in worn}
+        for user_id, count in worn.items():
+            stats.record(user_id, wears=count)
+        fragment_cache.bump_wardrobe_version(*worn)
+        for user_id, old_version in old_versions.items():
+            # Wear counts alone don't invalidate the precomputed suggestions
+            outfits.carry_forward(user_id, old_version)
+        co2_today = round(sum(worn.values()) * UserStats.CO2_PER_WEAR_KG, 1)
+
+    # Saves wear counts along with the suggestion cursor / refreshed set
+    db.session.commit()
 
     return render_template('outfit/dashboard.html', 
                            outfit=suggested_outfit, 
-                           occasion=occasion)
\ No newline at end of file
+                           occasion=occasion,
+                           co2_today=co2_today)
\ No newline at end of file
@@ -0,0 +1,141 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+
+# Admission control for Gemini calls. A global token bucket keeps us inside
+# the model quota, per-user buckets stop one person from draining it, and a
+# small bounded wait queue absorbs short bursts. Anything that would wait past
+# its deadline is turned away at once so the caller can serve its fallback.
+#
+# Rates are per worker process: divide the account quota by the worker count.
+
+
+class TokenBucket:
+    """Reservation-style bucket: tokens may go negative to queue callers."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate            # tokens per second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now):
+        """Seconds until one token is available for a new caller."""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def reserve(self):
+        self.tokens -= 1
+
+
+class AdmissionStats:
+    def __init__(self):
+        self.admitted = 0
+        self.rejected = {'global_wait': 0, 'user_wait': 0, 'queue_full': 0}
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def as_dict(self):
+        return {
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "avg_wait_ms": round(self.total_wait / self.admitted * 1000, 1) if self.admitted else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 1),
+        }
+
+
+class AdmissionController:
+    def __init__(self, rate_per_min=60, burst=10, user_rate_per_min=6, user_burst=3,
+                 max_wait=2.0, max_queue=8, max_users=10000):
+        self.global_bucket = TokenBucket(rate_per_min / 60.0, burst)
+        self.user_rate = user_rate_per_min / 60.0
+        self.user_burst = user_burst
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.max_users = max_users
+        self.stats = AdmissionStats()
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _user_bucket(self, key):
+        bucket = self._users.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.user_rate, self.user_burst)
+            self._users[key] = bucket
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        else:
+            self._users.move_to_end(key)
+        return bucket
+
+    def admit(self, user_key, max_wait=None):
+        """
+        Returns True once the call may go ahead (after waiting at most
+        `max_wait` seconds), or False immediately if it should degrade.
+        """
+        deadline = self.max_wait if max_wait is None else max_wait
+
+        with self._lock:
+            now = time.monotonic()
+            user_bucket = self._user_bucket(user_key)
+            user_wait = user_bucket.wait_time(now)
+            global_wait = self.global_bucket.wait_time(now)
+            wait = max(user_wait, global_wait)
+
+            if user_wait > deadline:
+                self.stats.rejected['user_wait'] += 1
+                return False
+            if global_wait > deadline:
+                self.stats.rejected['global_wait'] += 1
+                return False
+            if wait > 0 and self.stats.queue_depth >= self.max_queue:
+                self.stats.rejected['queue_full'] += 1
+                return False
+
+            user_bucket.reserve()
+            self.global_bucket.reserve()
+            self.stats.admitted += 1
+            self.stats.total_wait += wait
+            self.stats.max_wait = max(self.stats.max_wait, wait)
+            if wait > 0:
+                self.stats.queue_depth += 1
+                self.stats.max_queue_depth = max(self.stats.max_queue_depth, self.stats.queue_depth)
+
+        if wait > 0:
+            time.sleep(wait)
+            with self._lock:
+                self.stats.queue_depth -= 1
+        return True
+
+    def snapshot(self):
+        with self._lock:
+            return self.stats.as_dict()
+
+
+def _env_number(name, default):
+    return type(default)(os.getenv(name, default))
+
+
+controller = AdmissionController(
+    rate_per_min=_env_number('AI_RATE_PER_MIN', 60),
+    burst=_env_number('AI_BURST', 10),
+    user_rate_per_min=_env_number('AI_USER_RATE_PER_MIN', 6),
+    user_burst=_env_number('AI_USER_BURST', 3),
+    max_wait=_env_number('AI_MAX_WAIT', 2.0),
+    max_queue=_env_number('AI_MAX_QUEUE', 8),
+)
+
+
+def admit_ai_call(user_key):
+    return controller.admit(user_key)
@@ -0,0 +1,129 @@
+import csv
+import io
+import json
+from sqlalchemy import insert
+from rewear_ai.app import db
+
+# Rows fetched per round trip when streaming out, and rows per executemany
+# batch when streaming in. Memory stays flat at roughly one batch.
+BATCH_SIZE = 1000
+
+
+def column_limits(model, fields):
+    """Returns {field: max_length} for the String columns of a model."""
+    limits = {}
+    for field in fields:
+        length = getattr(model.__table__.c[field].type, 'length', None)
+        if length:
+            limits[field] = length
+    return limits
+
+
+def required_fields(model, fields):
+    """Fields that are NOT NULL and have no default on the model."""
+    table = model.__table__
+    return [
+        f for f in fields
+        if not table.c[f].nullable and table.c[f].default is None
+    ]
+
+
+def stream_rows(stmt, fields, batch_size=BATCH_SIZE):
+    """
+    Yields one dict per row of a column select using a server-side cursor.
+    `yield_per` keeps only one batch of rows in memory at a time.
+    """
+    stmt = stmt.execution_options(stream_results=True, yield_per=batch_size)
+    result = db.session.execute(stmt)
+    try:
+        for row in result:
+            yield dict(zip(fields, row))
+    finally:
+        result.close()
+
+
+def to_csv(rows, fields):
+    """Encodes a row iterator as CSV, one chunk per row after the header."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    tail = buffer.getvalue()
+    if tail:
+        yield tail
+
+
+def to_jsonl(rows):
+    for row in rows:
+        yield json.dumps(row, default=str) + "\n"
+
+
+def parse_csv(stream):
+    """Reads CSV rows lazily from a binary stream."""
+    text = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+    for row in csv.DictReader(text):
+        yield row
+
+
+def parse_jsonl(stream):
+    """Reads JSON Lines lazily from a binary stream, skipping blank lines."""
+    text = io.TextIOWrapper(stream, encoding='utf-8')
+    for line in text:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def clean_row(raw, fields, limits, required, integer_fields=()):
+    """
+    Validates one incoming row against the model's column limits.
+    `integer_fields` are counts and must be whole numbers >= 0.
+    Returns (row, error). Unknown keys are dropped.
+    """
+    row = {}
+    for field in fields:
+        value = raw.get(field)
+        if value is None or value == '':
+            continue
+        if field in integer_fields:
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                return None, f"'{field}' must be a number"
+            if value < 0:
+                return None, f"'{field}' can't be negative"
+        else:
+            value = str(value).strip()
+            limit = limits.get(field)
+            if limit and len(value) > limit:
+                return None, f"'{field}' is longer than {limit} characters"
+        row[field] = value
+
+    missing = [f for f in required if f not in row]
+    if missing:
+        return None, f"missing {', '.join(missing)}"
+    return row, None
+
+
+def bulk_insert(model, rows, batch_size=BATCH_SIZE):
+    """
+    Inserts an iterator of dicts in executemany batches.
+    Returns the number of rows written. Caller owns the commit.
+    """
+    stmt = insert(model)
+    batch = []
+    total = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            db.session.execute(stmt, batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(stmt, batch)
+        total += len(batch)
+    return total
@@ -0,0 +1,85 @@
+import os
+import time
+import hashlib
+from functools import wraps
+from flask import request, session, make_response, current_app, url_for
+
+# Validators are built from cheap version stamps (wardrobe version, auth
+# version, time buckets) so a matching If-None-Match is answered with 304
+# before the view runs, instead of hashing the rendered output afterwards.
+
+# Fallback when APP_VERSION is unset: a new deploy still changes every ETag
+_BOOT_STAMP = str(int(time.time()))
+
+# Uploaded photos requested with ?v=<stamp> never change under that URL
+IMMUTABLE_MAX_AGE = 31536000
+
+
+def make_etag(*parts):
+    raw = "|".join(str(p) for p in (current_app.config.get('APP_VERSION'), *parts))
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:20]
+
+
+def time_bucket(seconds):
+    """Stamp that changes every `seconds`, for data fetched from live APIs."""
+    return int(time.time() // seconds)
+
+
+def conditional(etag_fn, weak=False, cache_control='private, no-cache'):
+    """
+    Decorator for GET views. `etag_fn` receives the view kwargs and returns
+    an ETag (or None to opt out for this request).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # Flashed messages are one-shot; never hide them behind a 304
+            if request.method != 'GET' or session.get('_flashes'):
+                return view(*args, **kwargs)
+
+            etag = etag_fn(**kwargs)
+            if etag is None:
+                return view(*args, **kwargs)
+
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag, weak=weak)
+            response.headers['Cache-Control'] = cache_control
+            return response
+        return wrapper
+    return decorator
+
+
+def upload_url(filename):
+    """
+    URL for an uploaded photo, versioned by the file's mtime and size so it
+    can be cached as immutable. Falls back to the plain URL if missing.
+    """
+    path = os.path.join(current_app.static_folder, 'uploads', filename)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return url_for('static', filename='uploads/' + filename)
+    stamp = format(stat.st_mtime_ns ^ stat.st_size, 'x')[-10:]
+    return url_for('static', filename='uploads/' + filename, v=stamp)
+
+
+def init_app(app):
+    app.config.setdefault('APP_VERSION', os.getenv('APP_VERSION', _BOOT_STAMP))
+    app.jinja_env.globals['upload_url'] = upload_url
+
+    @app.after_request
+    def cache_uploads(response):
+        if (request.endpoint == 'static'
+                and request.path.startswith('/static/uploads/')
+                and response.status_code in (200, 304)):
+            if request.args.get('v'):
+                response.headers['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+            else:
+                response.headers['Cache-Control'] = 'public, no-cache'
+        return response
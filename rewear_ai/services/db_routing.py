@@ -0,0 +1,96 @@
+import os
+import time
+from functools import wraps
+from flask import g, current_app, has_app_context, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+# Routes that only read can be marked with @read_only (or a whole blueprint
+# with read_only_blueprint). While such a request runs, db.session sends
+# queries to the engine named by SQLALCHEMY_READ_BIND: the read replica from
+# DATABASE_REPLICA_URL, or a read-only SQLite connection (services/sqlite_mode.py).
+# Anything that flushes still goes to the primary, and the session sticks to
+# the primary from then on so the request always sees its own writes.
+#
+# Replicas lag behind, so a browser that just committed a write is also kept
+# on the primary for DB_PRIMARY_STICKY_SECONDS (stamped in its session cookie).
+
+REPLICA_BIND = 'replica'
+STICKY_KEY = 'db_primary_until'
+
+
+def configure_replica(app, url):
+    """Adds the replica bind and routes reads to it. Call before db.init_app."""
+    if url.startswith("postgres://"):
+        url = url.replace("postgres://", "postgresql://", 1)
+    app.config.setdefault('SQLALCHEMY_BINDS', {})[REPLICA_BIND] = {
+        'url': url,
+        'pool_pre_ping': True,
+    }
+    app.config['SQLALCHEMY_READ_BIND'] = REPLICA_BIND
+    app.config.setdefault('DB_PRIMARY_STICKY_SECONDS',
+                          float(os.getenv('DB_PRIMARY_STICKY_SECONDS', 5)))
+
+
+def read_only(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.db_read_only = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def read_only_blueprint(bp):
+    """Marks every GET/HEAD request handled by a blueprint as read-only."""
+    @bp.before_request
+    def _mark_read_only():
+        if request.method in ('GET', 'HEAD'):
+            g.db_read_only = True
+    return bp
+
+
+def _pinned_to_primary():
+    return has_request_context() and session.get(STICKY_KEY, 0) > time.time()
+
+
+def _read_engine(engines):
+    if not has_app_context() or not g.get('db_read_only'):
+        return None
+    key = current_app.config.get('SQLALCHEMY_READ_BIND')
+    if not key or _pinned_to_primary():
+        return None
+    return engines.get(key)
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and not self.info.get('used_primary'):
+            engine = _read_engine(self._db.engines)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper, clause=clause, bind=bind, **kwargs)
+
+    def flush(self, objects=None):
+        if self.new or self.dirty or self.deleted:
+            self.info['used_primary'] = True
+        super().flush(objects)
+
+    def execute(self, statement, *args, **kwargs):
+        # Core INSERT/UPDATE/DELETE bypass flush; they pin the primary too
+        if getattr(statement, 'is_dml', False):
+            self.info['used_primary'] = True
+        return super().execute(statement, *args, **kwargs)
+
+    def close(self):
+        self.info.pop('used_primary', None)
+        super().close()
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _stick_to_primary(db_session):
+    """After a committed write, keep this browser off the replica for a while."""
+    if not db_session.info.get('used_primary') or not has_request_context():
+        return
+    window = current_app.config.get('DB_PRIMARY_STICKY_SECONDS')
+    if window:
+        session[STICKY_KEY] = time.time() + window
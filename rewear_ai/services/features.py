@@ -0,0 +1,189 @@
+import os
+import threading
+from collections import OrderedDict
+import click
+import numpy as np
+from flask import current_app
+from flask.cli import with_appcontext
+from PIL import Image
+from sqlalchemy import select
+from rewear_ai.app import db
+
+# Compact visual fingerprint for each garment photo, computed on CPU at
+# upload time: a coarse RGB color histogram plus a tiny grayscale thumbnail
+# (a cheap "embedding" that captures shape and pattern). Both halves are
+# L2-normalised so cosine similarity is a plain dot product.
+
+HIST_BINS = 4                               # per channel -> 64 color bins
+THUMB_SIZE = 8                              # 8x8 grayscale -> 64 values
+VECTOR_DIM = HIST_BINS ** 3 + THUMB_SIZE ** 2
+VECTOR_DTYPE = np.float32
+
+# Cosine similarity above which an upload is flagged as a likely duplicate
+DUPLICATE_THRESHOLD = 0.95
+SIMILAR_ITEMS = 4
+
+
+def _unit(vec):
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+def extract_features(image_path):
+    """Returns the packed float32 feature vector for an image, or None."""
+    try:
+        with Image.open(image_path) as img:
+            rgb = img.convert('RGB')
+            rgb.thumbnail((128, 128))
+            pixels = np.asarray(rgb, dtype=np.uint8).reshape(-1, 3)
+            thumb = np.asarray(
+                rgb.convert('L').resize((THUMB_SIZE, THUMB_SIZE), Image.BILINEAR),
+                dtype=np.float32
+            ).ravel()
+    except Exception as e:
+        print(f"Feature Extraction Error: {e}")
+        return None
+
+    bins = (pixels // (256 // HIST_BINS)).astype(np.int32)
+    codes = bins[:, 0] * HIST_BINS * HIST_BINS + bins[:, 1] * HIST_BINS + bins[:, 2]
+    hist = np.bincount(codes, minlength=HIST_BINS ** 3).astype(np.float32)
+
+    vector = np.concatenate([_unit(hist), _unit(thumb - thumb.mean())])
+    return pack(_unit(vector))
+
+
+def pack(vector):
+    return np.asarray(vector, dtype=VECTOR_DTYPE).tobytes()
+
+
+def unpack(blob):
+    return np.frombuffer(blob, dtype=VECTOR_DTYPE)
+
+
+class SimilarityIndex:
+    """Exact cosine k-NN over one wardrobe, as a single matrix-vector product."""
+
+    def __init__(self, ids, matrix):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.matrix = matrix
+
+    @classmethod
+    def from_rows(cls, rows):
+        rows = [(item_id, blob) for item_id, blob in rows
+                if blob and len(blob) == VECTOR_DIM * np.dtype(VECTOR_DTYPE).itemsize]
+        if not rows:
+            return cls([], np.empty((0, VECTOR_DIM), dtype=VECTOR_DTYPE))
+        ids, blobs = zip(*rows)
+        matrix = np.frombuffer(b"".join(blobs), dtype=VECTOR_DTYPE).reshape(len(ids), VECTOR_DIM)
+        return cls(ids, matrix)
+
+    def query(self, vector, k=SIMILAR_ITEMS, exclude_id=None):
+        """Returns [(item_id, similarity), ...] best first."""
+        if not len(self.ids):
+            return []
+        scores = self.matrix @ vector
+        if exclude_id is not None:
+            scores = np.where(self.ids == exclude_id, -np.inf, scores)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(self.ids[i]), float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+
+class IndexCache:
+    """Per-worker LRU of wardrobe indexes keyed by (user, wardrobe version)."""
+
+    def __init__(self, max_users=256):
+        self.max_users = max_users
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id, version):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry[0] == version:
+                self._entries.move_to_end(user_id)
+                return entry[1]
+            return None
+
+    def put(self, user_id, version, index):
+        with self._lock:
+            self._entries[user_id] = (version, index)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+
+
+index_cache = IndexCache()
+
+
+def wardrobe_index(user_id):
+    """The user's similarity index, rebuilt only when the wardrobe changes."""
+    from rewear_ai.wardrobe.models import ClothingItem
+    from rewear_ai.services.fragment_cache import wardrobe_version
+
+    version = wardrobe_version(user_id)
+    index = index_cache.get(user_id, version)
+    if index is None:
+        rows = db.session.execute(
+            select(ClothingItem.id, ClothingItem.feature_vector)
+            .where(ClothingItem.user_id == user_id, ClothingItem.feature_vector.isnot(None))
+        ).all()
+        index = SimilarityIndex.from_rows(rows)
+        index_cache.put(user_id, version, index)
+    return index
+
+
+def similar_items(user_id, blob, k=SIMILAR_ITEMS, exclude_id=None):
+    if not blob:
+        return []
+    return wardrobe_index(user_id).query(unpack(blob), k=k, exclude_id=exclude_id)
+
+
+def find_duplicate(user_id, blob):
+    """Closest existing item if it looks like the same garment, else None."""
+    matches = similar_items(user_id, blob, k=1)
+    if matches and matches[0][1] >= DUPLICATE_THRESHOLD:
+        return matches[0][0]
+    return None
+
+
+@click.command('backfill-features')
+@with_appcontext
+def backfill_features():
+    """Computes feature vectors for items uploaded before they existed."""
+    from rewear_ai.wardrobe.models import ClothingItem
+    from rewear_ai.services.fragment_cache import bump_wardrobe_version
+
+    upload_dir = os.path.join(current_app.static_folder, 'uploads')
+    pending = db.session.execute(
+        select(ClothingItem.id, ClothingItem.user_id, ClothingItem.image_file)
+        .where(ClothingItem.feature_vector.is_(None),
+               ClothingItem.image_file.isnot(None),
+               ClothingItem.image_file != 'default.jpg')
+        .order_by(ClothingItem.user_id)
+    ).all()
+
+    done = 0
+    touched = set()
+    for item_id, user_id, image_file in pending:
+        path = os.path.join(upload_dir, image_file)
+        if not os.path.exists(path):
+            continue
+        blob = extract_features(path)
+        if blob:
+            db.session.get(ClothingItem, item_id).feature_vector = blob
+            touched.add(user_id)
+            done += 1
+        if len(touched) >= 200:
+            # New vectors only show up in indexes built for a newer version
+            bump_wardrobe_version(*touched)
+            db.session.commit()
+            touched.clear()
+    bump_wardrobe_version(*touched)
+    db.session.commit()
+    click.echo(f"Computed features for {done} of {len(pending)} items.")
+
+
+def init_app(app):
+    app.cli.add_command(backfill_features)
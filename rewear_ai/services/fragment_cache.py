@@ -0,0 +1,183 @@
+import os
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from flask import g
+from sqlalchemy import select, update
+from rewear_ai.app import db
+
+# Rendered HTML fragments keyed by the owner's wardrobe version. Anything that
+# changes a wardrobe bumps users.wardrobe_version in the same transaction, so
+# old entries are never read again and simply age out of the backend.
+
+
+class LRUBackend:
+    """Per-worker cache bounded by total stored characters."""
+
+    def __init__(self, max_chars=32 * 1024 * 1024):
+        self.max_chars = max_chars
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if len(value) > self.max_chars:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._entries[key] = value
+            self._size += len(value)
+            while self._size > self.max_chars:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+class DiskBackend:
+    """
+    Shared cache for several workers on one host (or a shared volume).
+    Writes go through a temp file and os.replace so readers never see a
+    partial entry. Oldest files are pruned once max_files is exceeded.
+    """
+
+    def __init__(self, directory, max_files=20000):
+        self.directory = directory
+        self.max_files = max_files
+        self._writes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def set(self, key, value):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(value)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        self._writes += 1
+        if self._writes % 500 == 0:
+            self.prune()
+
+    def prune(self):
+        try:
+            entries = [e for e in os.scandir(self.directory) if not e.name.startswith('.tmp-')]
+        except OSError:
+            return
+        if len(entries) <= self.max_files:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for entry in entries[:len(entries) - self.max_files]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    def clear(self):
+        for entry in os.scandir(self.directory):
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+
+class NullBackend:
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def clear(self):
+        pass
+
+
+backend = LRUBackend()
+
+
+def init_app(app):
+    global backend
+    kind = app.config.setdefault('FRAGMENT_CACHE', os.getenv('FRAGMENT_CACHE', 'lru'))
+
+    if kind == 'disk':
+        directory = app.config.setdefault(
+            'FRAGMENT_CACHE_DIR',
+            os.getenv('FRAGMENT_CACHE_DIR', os.path.join(app.instance_path, 'fragments'))
+        )
+        backend = DiskBackend(directory)
+    elif kind == 'none':
+        backend = NullBackend()
+    else:
+        max_mb = int(app.config.setdefault('FRAGMENT_CACHE_MB', os.getenv('FRAGMENT_CACHE_MB', '32')))
+        backend = LRUBackend(max_chars=max_mb * 1024 * 1024)
+
+
+def wardrobe_version(user_id):
+    """
+    Current wardrobe version for a user (a single indexed scalar read,
+    remembered for the rest of the request).
+    """
+    from rewear_ai.wardrobe.models import User
+    versions = g.setdefault('wardrobe_versions', {})
+    if user_id not in versions:
+        versions[user_id] = db.session.execute(
+            select(User.wardrobe_version).where(User.id == user_id)
+        ).scalar() or 0
+    return versions[user_id]
+
+
+def bump_wardrobe_version(*user_ids):
+    """
+    Marks wardrobes as changed. Call before commit so the bump lands in the
+    same transaction as the change itself.
+    """
+    from rewear_ai.wardrobe.models import User
+    ids = {uid for uid in user_ids if uid is not None}
+    if not ids:
+        return
+    for uid in ids:
+        g.get('wardrobe_versions', {}).pop(uid, None)
+    db.session.execute(
+        update(User)
+        .where(User.id.in_(ids))
+        .values(wardrobe_version=User.wardrobe_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def fragment_key(name, user_id, version, *parts):
+    return ":".join([name, str(user_id), f"v{version}", *map(str, parts)])
+
+
+def get(key):
+    return backend.get(key)
+
+
+def put(key, value):
+    backend.set(key, value)
@@ -0,0 +1,265 @@
+import bz2
+import gzip
+import math
+from datetime import datetime
+import xml.etree.ElementTree as ET
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import select, delete, func
+from rewear_ai.app import db
+
+# Offline ingestion of charity-like places from OpenStreetMap extracts, so
+# /donate/api/nearby can answer from our own indexed table instead of calling
+# Overpass on every request. Files are streamed element by element: XML with
+# iterparse (clearing as we go), PBF through pyosmium when it is installed.
+# Like the live Overpass query, only nodes are considered.
+
+UPSERT_BATCH = 1000
+
+# Grid used for the geo_bucket column: 0.1° cells (~11km north-south)
+BUCKET_DEGREES = 0.1
+EARTH_RADIUS_KM = 6371.0
+
+
+def is_charity(tags):
+    """Same selection as the Overpass query in donate.routes."""
+    return (
+        'social_facility' in tags
+        or tags.get('amenity') == 'social_centre'
+        or tags.get('office') == 'ngo'
+        or tags.get('charity') == 'yes'
+    )
+
+
+def geo_bucket(lat, lon):
+    lat_cell = math.floor(lat / BUCKET_DEGREES)
+    lon_cell = math.floor(lon / BUCKET_DEGREES)
+    return (lat_cell + 900) * 4000 + (lon_cell + 1800)
+
+
+def buckets_around(lat, lon, radius_km):
+    """Every bucket that may hold points within radius_km of (lat, lon)."""
+    lat_span = math.ceil(radius_km / (111.0 * BUCKET_DEGREES))
+    lon_km = 111.0 * BUCKET_DEGREES * max(math.cos(math.radians(lat)), 0.01)
+    lon_span = math.ceil(radius_km / lon_km)
+    lat_cell = math.floor(lat / BUCKET_DEGREES)
+    lon_cell = math.floor(lon / BUCKET_DEGREES)
+    return [
+        (lat_cell + dy + 900) * 4000 + (lon_cell + dx + 1800)
+        for dy in range(-lat_span, lat_span + 1)
+        for dx in range(-lon_span, lon_span + 1)
+    ]
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def to_row(osm_id, lat, lon, tags):
+    """Maps an OSM node onto charities columns, mirroring the live API output."""
+    return {
+        "osm_id": osm_id,
+        "source": "osm",
+        "name": (tags.get('name') or tags.get('official_name') or "Community Support Center")[:100],
+        "address": (tags.get('addr:street') or tags.get('addr:city') or "Local Area")[:200],
+        "phone": (tags.get('phone') or tags.get('contact:phone') or '')[:50] or None,
+        "kind": (tags.get('social_facility:for') or "Non-Profit")[:100],
+        "lat": lat,
+        "lon": lon,
+        "geo_bucket": geo_bucket(lat, lon),
+    }
+
+
+# --- Readers: yield (action, osm_id, lat, lon, tags) for every node ---
+
+def _open(path):
+    if path.endswith('.bz2'):
+        return bz2.open(path, 'rb')
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def read_xml(path):
+    """
+    Streams .osm (full extract) or .osc (osmChange diff) XML. Elements are
+    cleared once handled so memory stays flat however big the file is.
+    """
+    action = 'modify'
+    depth = 0
+    root = None
+    with _open(path) as f:
+        for event, elem in ET.iterparse(f, events=('start', 'end')):
+            if event == 'start':
+                depth += 1
+                if root is None:
+                    root = elem
+                if elem.tag in ('create', 'modify', 'delete'):
+                    action = elem.tag
+                continue
+
+            depth -= 1
+            if elem.tag == 'node':
+                tags = {t.get('k'): t.get('v') for t in elem.iter('tag')}
+                lat, lon = elem.get('lat'), elem.get('lon')
+                yield (
+                    action, int(elem.get('id')),
+                    float(lat) if lat else None, float(lon) if lon else None,
+                    tags
+                )
+            if depth <= 1 and root is not None:
+                # Drop finished top-level children (and nested ones in diffs)
+                root.clear()
+            elif elem.tag in ('node', 'way', 'relation'):
+                elem.clear()
+
+
+def read_pbf(path):
+    try:
+        import osmium
+    except ImportError:
+        raise click.ClickException("Reading .pbf files needs pyosmium: pip install osmium")
+
+    for obj in osmium.FileProcessor(path, osmium.osm.NODE):
+        if not obj.location.valid():
+            continue
+        action = 'delete' if obj.deleted else 'modify'
+        yield action, obj.id, obj.location.lat, obj.location.lon, {t.k: t.v for t in obj.tags}
+
+
+# --- Writers ---
+
+def _upsert(rows):
+    from rewear_ai.wardrobe.models import Charity
+
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise click.ClickException(f"Upserts are not supported on {dialect}")
+
+    stmt = insert(Charity)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Charity.osm_id],
+        set_={col: stmt.excluded[col] for col in rows[0] if col != 'osm_id'}
+    )
+    db.session.execute(stmt, rows)
+
+
+def _delete(osm_ids):
+    from rewear_ai.wardrobe.models import Charity
+    db.session.execute(
+        delete(Charity).where(Charity.osm_id.in_(osm_ids)).execution_options(synchronize_session=False)
+    )
+
+
+def ingest(records, diff=False, batch_size=UPSERT_BATCH):
+    """
+    Applies node records to the charities table in batches. With `diff`,
+    nodes that are deleted or lost their charity tags are removed as well.
+    Returns counts.
+    """
+    upserts, deletes = {}, set()
+    counts = {"upserted": 0, "deleted": 0, "scanned": 0}
+    stamp = datetime.utcnow()
+
+    def flush():
+        if upserts:
+            _upsert(list(upserts.values()))
+            counts["upserted"] += len(upserts)
+            upserts.clear()
+        if deletes:
+            _delete(list(deletes))
+            counts["deleted"] += len(deletes)
+            deletes.clear()
+        db.session.commit()
+
+    for action, osm_id, lat, lon, tags in records:
+        counts["scanned"] += 1
+        if action != 'delete' and lat is not None and lon is not None and is_charity(tags):
+            deletes.discard(osm_id)
+            upserts[osm_id] = dict(to_row(osm_id, lat, lon, tags), ingested_at=stamp)
+        elif diff and action != 'create':
+            upserts.pop(osm_id, None)
+            deletes.add(osm_id)
+
+        if len(upserts) >= batch_size or len(deletes) >= batch_size:
+            flush()
+    flush()
+    return counts
+
+
+def nearby_local(lat, lon, radius_km):
+    """OSM charities within radius_km, nearest first, from the bucket index."""
+    from rewear_ai.wardrobe.models import Charity
+
+    rows = db.session.execute(
+        select(Charity.name, Charity.address, Charity.kind, Charity.lat, Charity.lon)
+        .where(Charity.source == 'osm', Charity.geo_bucket.in_(buckets_around(lat, lon, radius_km)))
+    ).all()
+
+    found = []
+    for name, address, kind, c_lat, c_lon in rows:
+        dist = distance_km(lat, lon, c_lat, c_lon)
+        if dist <= radius_km:
+            found.append((dist, {"name": name, "lat": c_lat, "lon": c_lon,
+                                 "type": kind or "Non-Profit", "address": address}))
+    found.sort(key=lambda pair: pair[0])
+    return [entry for _, entry in found]
+
+
+def has_local_data():
+    from rewear_ai.wardrobe.models import Charity
+    return db.session.execute(
+        select(Charity.id).where(Charity.source == 'osm').limit(1)
+    ).first() is not None
+
+
+@click.command('ingest-osm')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--diff', is_flag=True,
+              help='PATH is a change file (implied for .osc files).')
+@click.option('--full', is_flag=True,
+              help='PATH is a complete snapshot: drop stored OSM rows not seen in it.')
+@with_appcontext
+def ingest_osm(path, diff, full):
+    """Loads charities from an OSM extract (.osm[.bz2|.gz], .pbf) or diff (.osc[.gz])."""
+    from rewear_ai.wardrobe.models import Charity
+
+    diff = diff or '.osc' in path
+    records = read_pbf(path) if path.endswith('.pbf') else read_xml(path)
+
+    seen = set()
+    def tracked(source):
+        for record in source:
+            if is_charity(record[4]):
+                seen.add(record[1])
+            yield record
+
+    counts = ingest(tracked(records), diff=diff)
+
+    if full:
+        # Rows for places that vanished from the snapshot
+        stale = [
+            osm_id for osm_id in db.session.execute(
+                select(Charity.osm_id).where(Charity.source == 'osm')
+            ).scalars() if osm_id not in seen
+        ]
+        for start in range(0, len(stale), UPSERT_BATCH):
+            _delete(stale[start:start + UPSERT_BATCH])
+        db.session.commit()
+        counts["deleted"] += len(stale)
+
+    total = db.session.execute(select(func.count(Charity.id)).where(Charity.source == 'osm')).scalar()
+    click.echo(f"Scanned {counts['scanned']} nodes: {counts['upserted']} upserted, "
+               f"{counts['deleted']} removed. {total} OSM charities stored.")
+
+
+def init_app(app):
+    app.cli.add_command(ingest_osm)
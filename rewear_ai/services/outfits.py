@@ -0,0 +1,181 @@
+import itertools
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import select, update, func
+from sqlalchemy.exc import IntegrityError
+from rewear_ai.app import db
+
+# Outfit suggestions are ranked ahead of time (see `flask precompute-outfits`)
+# for every occasion and temperature band, so the style dashboard only has to
+# pick the next stored combination. A miss or a stale wardrobe version falls
+# back to computing the one requested combination on demand.
+
+OCCASIONS = ['Casual', 'Work', 'Evening', 'Sport']
+
+# (band, upper bound in °C); temperatures at or above the last bound are 'warm'
+TEMP_BANDS = [('cold', 10), ('mild', 18), ('warm', None)]
+ANY_BAND = 'any'
+LAYERED_BANDS = ('cold', 'mild')
+
+SUGGESTIONS_PER_BAND = 10
+# Least-worn pieces per category that take part in ranking
+CANDIDATES_PER_CATEGORY = 4
+
+
+def temp_band(temp):
+    if temp is None:
+        return ANY_BAND
+    for band, upper in TEMP_BANDS:
+        if upper is None or temp < upper:
+            return band
+
+
+def _by_category(user_id, occasion):
+    """Items grouped by category, least worn first (reuse what sits idle)."""
+    from rewear_ai.wardrobe.models import ClothingItem
+
+    query = select(ClothingItem.id, ClothingItem.category, ClothingItem.occasion,
+                   ClothingItem.times_worn)
+    if user_id is not None:
+        query = query.where(ClothingItem.user_id == user_id)
+    query = query.where(
+        ClothingItem.category.in_(['Top', 'Bottom', 'Shoes', 'Outerwear'])
+    ).order_by(func.coalesce(ClothingItem.times_worn, 0), ClothingItem.id)
+
+    groups = {'Top': [], 'Bottom': [], 'Shoes': [], 'Outerwear': [], 'AnyOuterwear': []}
+    for item_id, category, item_occasion, worn in db.session.execute(query):
+        entry = (item_id, worn or 0)
+        if category == 'Outerwear':
+            groups['AnyOuterwear'].append(entry)
+        if item_occasion == occasion:
+            groups[category].append(entry)
+    return groups
+
+
+def rank_outfits(user_id, occasion, band, limit=SUGGESTIONS_PER_BAND):
+    """Returns [[top, bottom, shoes, outerwear|None], ...] best first."""
+    groups = _by_category(user_id, occasion)
+    tops, bottoms, shoes = (groups[c][:CANDIDATES_PER_CATEGORY] for c in ('Top', 'Bottom', 'Shoes'))
+    if not (tops and bottoms and shoes):
+        return []
+
+    # Weather-aware layering: prefer outerwear for the occasion, else any
+    outerwear = []
+    if band in LAYERED_BANDS:
+        outerwear = (groups['Outerwear'] or groups['AnyOuterwear'])[:CANDIDATES_PER_CATEGORY]
+
+    combos = sorted(
+        itertools.product(tops, bottoms, shoes),
+        key=lambda combo: sum(worn for _, worn in combo)
+    )[:limit]
+
+    return [
+        [top[0], bottom[0], shoe[0], outerwear[i % len(outerwear)][0] if outerwear else None]
+        for i, (top, bottom, shoe) in enumerate(combos)
+    ]
+
+
+def refresh(user_id, occasion, band, version):
+    """(Re)computes one stored suggestion set and returns it."""
+    from rewear_ai.wardrobe.models import OutfitSuggestion
+
+    row = db.session.get(OutfitSuggestion, (user_id, occasion, band))
+    if row is None:
+        try:
+            with db.session.begin_nested():
+                row = OutfitSuggestion(user_id=user_id, occasion=occasion, temp_band=band,
+                                       wardrobe_version=version, cursor=0, outfits=[])
+                db.session.add(row)
+        except IntegrityError:
+            # A concurrent request stored this set first; overwrite it below
+            row = db.session.get(OutfitSuggestion, (user_id, occasion, band), populate_existing=True)
+    row.outfits = rank_outfits(user_id, occasion, band)
+    row.wardrobe_version = version
+    row.cursor = 0
+    return row
+
+
+def refresh_user(user_id):
+    """Precomputes every occasion/band combination for one user."""
+    from rewear_ai.services.fragment_cache import wardrobe_version
+    version = wardrobe_version(user_id)
+    bands = [band for band, _ in TEMP_BANDS] + [ANY_BAND]
+    for occasion in OCCASIONS:
+        for band in bands:
+            refresh(user_id, occasion, band, version)
+
+
+def next_outfit(user_id, occasion, temp):
+    """
+    Picks the next precomputed outfit ids for the user in O(1), refreshing
+    that one set on a miss. Returns None when the wardrobe can't make one.
+    """
+    from rewear_ai.wardrobe.models import OutfitSuggestion
+    from rewear_ai.services.fragment_cache import wardrobe_version
+
+    band = temp_band(temp)
+    version = wardrobe_version(user_id)
+
+    row = db.session.get(OutfitSuggestion, (user_id, occasion, band))
+    if row is None or row.wardrobe_version != version:
+        row = refresh(user_id, occasion, band, version)
+    if not row.outfits:
+        return None
+
+    pick = row.outfits[row.cursor % len(row.outfits)]
+    row.cursor = (row.cursor + 1) % len(row.outfits)
+    return pick
+
+
+def carry_forward(user_id, old_version):
+    """
+    Wear counts don't change which outfits are possible, so when a wear bumps
+    the wardrobe version the stored suggestions move to the new version too.
+    Call after bump_wardrobe_version, in the same transaction.
+    """
+    from rewear_ai.wardrobe.models import User, OutfitSuggestion
+
+    # Read back what the bump produced (our UPDATE holds the row until commit).
+    # Anything beyond old_version + 1 means another change landed in between,
+    # and the stored sets must be recomputed instead.
+    new_version = db.session.execute(
+        select(User.wardrobe_version).where(User.id == user_id)
+    ).scalar()
+    if new_version != old_version + 1:
+        return
+    db.session.execute(
+        update(OutfitSuggestion)
+        .where(OutfitSuggestion.user_id == user_id,
+               OutfitSuggestion.wardrobe_version == old_version)
+        .values(wardrobe_version=new_version)
+        .execution_options(synchronize_session=False)
+    )
+
+
+@click.command('precompute-outfits')
+@with_appcontext
+@click.option('--user', 'user_ids', type=int, multiple=True, help='Only these user ids.')
+def precompute_outfits(user_ids):
+    """Refreshes stale outfit suggestions for every user with a wardrobe."""
+    from rewear_ai.wardrobe.models import User, ClothingItem, OutfitSuggestion
+
+    if not user_ids:
+        # Active users: anyone with clothes whose stored sets are missing or stale
+        fresh_sets = select(func.count()).where(
+            OutfitSuggestion.user_id == User.id,
+            OutfitSuggestion.wardrobe_version == User.wardrobe_version
+        ).scalar_subquery()
+        user_ids = db.session.execute(
+            select(User.id)
+            .where(select(ClothingItem.id).where(ClothingItem.user_id == User.id).exists())
+            .where(fresh_sets < len(OCCASIONS) * (len(TEMP_BANDS) + 1))
+        ).scalars().all()
+
+    for user_id in user_ids:
+        refresh_user(user_id)
+        db.session.commit()
+    click.echo(f"Precomputed outfits for {len(user_ids)} users.")
+
+
+def init_app(app):
+    app.cli.add_command(precompute_outfits)
@@ -0,0 +1,181 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import click
+from flask_bcrypt import Bcrypt
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Password hashing is deliberately slow. Every hash/verify runs on a small
+# dedicated pool with a short backlog; when that is full the request fails
+# fast with HashingBusy (the auth views answer "try again") instead of
+# parking a request thread. bcrypt and hashlib release the GIL, so the pool
+# gives real parallelism up to its size.
+#
+# The bound is per process: with N workers the site hashes at most
+# N * (PASSWORD_HASH_WORKERS + PASSWORD_HASH_BACKLOG) passwords at once.
+# It only sheds load under threaded workers (gthread, gevent); gunicorn's
+# sync workers already serve one request per process, so there the number
+# of workers is the limit.
+
+bcrypt = Bcrypt()
+
+ALGORITHMS = ('bcrypt', 'scrypt', 'pbkdf2')
+
+# bcrypt only ever used the first 72 bytes of a password; bcrypt 5 raises
+# instead of truncating, so we truncate ourselves (on hash and verify alike)
+BCRYPT_MAX_BYTES = 72
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing queue is full and the caller should back off."""
+
+
+def _bcrypt_input(password):
+    return password.encode('utf-8')[:BCRYPT_MAX_BYTES]
+
+
+class PasswordPolicy:
+    def __init__(self, algorithm='scrypt', bcrypt_rounds=12, scrypt_n=2**15,
+                 scrypt_r=8, scrypt_p=1, pbkdf2_iterations=600000):
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown password hash algorithm '{algorithm}'")
+        self.algorithm = algorithm
+        self.bcrypt_rounds = bcrypt_rounds
+        self.scrypt_n = scrypt_n
+        self.scrypt_r = scrypt_r
+        self.scrypt_p = scrypt_p
+        self.pbkdf2_iterations = pbkdf2_iterations
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            algorithm=config['PASSWORD_HASH_ALGORITHM'],
+            bcrypt_rounds=config['BCRYPT_LOG_ROUNDS'],
+            scrypt_n=config['SCRYPT_N'],
+            scrypt_r=config['SCRYPT_R'],
+            scrypt_p=config['SCRYPT_P'],
+            pbkdf2_iterations=config['PBKDF2_ITERATIONS'],
+        )
+
+    @property
+    def werkzeug_method(self):
+        if self.algorithm == 'scrypt':
+            return f"scrypt:{self.scrypt_n}:{self.scrypt_r}:{self.scrypt_p}"
+        return f"pbkdf2:sha256:{self.pbkdf2_iterations}"
+
+    def hash(self, password):
+        if self.algorithm == 'bcrypt':
+            return bcrypt.generate_password_hash(_bcrypt_input(password), self.bcrypt_rounds).decode('utf-8')
+        return generate_password_hash(password, method=self.werkzeug_method)
+
+    def verify(self, pw_hash, password):
+        if not pw_hash:
+            return False
+        if pw_hash.startswith('$2'):
+            return bcrypt.check_password_hash(pw_hash, _bcrypt_input(password))
+        return check_password_hash(pw_hash, password)
+
+    def needs_rehash(self, pw_hash):
+        """True when a stored hash was made with another algorithm or cost."""
+        if not pw_hash:
+            return False
+        if self.algorithm == 'bcrypt':
+            # Format: $2b$<rounds>$<salt+hash>
+            parts = pw_hash.split('$')
+            return not (pw_hash.startswith('$2') and len(parts) > 2
+                        and parts[2] == f"{self.bcrypt_rounds:02d}")
+        return pw_hash.split('$', 1)[0] != self.werkzeug_method
+
+
+class HashingPool:
+    """Thread pool with a bounded backlog for password work (per process)."""
+
+    def __init__(self, workers=2, backlog=4, wait=0.1):
+        # Kept short: a caller that can't get a slot almost at once backs off
+        self.wait = wait
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='pwhash')
+        self._slots = threading.BoundedSemaphore(workers + backlog)
+
+    def run(self, fn, *args):
+        if not self._slots.acquire(timeout=self.wait):
+            raise HashingBusy("Password hashing queue is full")
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+
+policy = PasswordPolicy()
+pool = HashingPool()
+
+
+# Config keys (overridable from the environment) and their defaults
+PASSWORD_DEFAULTS = {
+    'PASSWORD_HASH_ALGORITHM': 'scrypt',
+    'BCRYPT_LOG_ROUNDS': 12,
+    'SCRYPT_N': 2**15,
+    'SCRYPT_R': 8,
+    'SCRYPT_P': 1,
+    'PBKDF2_ITERATIONS': 600000,
+    'PASSWORD_HASH_WORKERS': 2,
+    'PASSWORD_HASH_BACKLOG': 4,
+    'PASSWORD_HASH_WAIT': 0.1,          # seconds to wait for a slot before HashingBusy
+}
+
+
+def init_app(app):
+    global policy, pool
+    for key, default in PASSWORD_DEFAULTS.items():
+        app.config.setdefault(key, type(default)(os.getenv(key, default)))
+
+    bcrypt.init_app(app)
+    policy = PasswordPolicy.from_config(app.config)
+    pool = HashingPool(
+        workers=app.config['PASSWORD_HASH_WORKERS'],
+        backlog=app.config['PASSWORD_HASH_BACKLOG'],
+        wait=app.config['PASSWORD_HASH_WAIT'],
+    )
+    app.cli.add_command(bench_passwords)
+
+
+def hash_password(password):
+    return pool.run(policy.hash, password)
+
+
+def verify_password(pw_hash, password):
+    return pool.run(policy.verify, pw_hash, password)
+
+
+def needs_rehash(pw_hash):
+    return policy.needs_rehash(pw_hash)
+
+
+@click.command('bench-passwords')
+@click.option('--rounds', default=5, help='Hashes timed per algorithm.')
+def bench_passwords(rounds):
+    """Reports hash/verify cost per algorithm at the configured parameters."""
+    for algorithm in ALGORITHMS:
+        candidate = PasswordPolicy(
+            algorithm=algorithm,
+            bcrypt_rounds=policy.bcrypt_rounds,
+            scrypt_n=policy.scrypt_n,
+            scrypt_r=policy.scrypt_r,
+            scrypt_p=policy.scrypt_p,
+            pbkdf2_iterations=policy.pbkdf2_iterations,
+        )
+        start = time.perf_counter()
+        for _ in range(rounds):
+            pw_hash = candidate.hash('benchmark-password')
+        hash_ms = (time.perf_counter() - start) * 1000 / rounds
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            candidate.verify(pw_hash, 'benchmark-password')
+        verify_ms = (time.perf_counter() - start) * 1000 / rounds
+
+        marker = '*' if algorithm == policy.algorithm else ' '
+        click.echo(f"{marker} {algorithm:<7} hash {hash_ms:8.1f} ms   verify {verify_ms:8.1f} ms")
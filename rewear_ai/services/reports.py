@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+from sqlalchemy import select, func
+from rewear_ai.app import db
+
+# Donation history reporting for the admin blueprint. Filters come from the
+# query string; exports stream through services/bulk.py and totals are
+# aggregated by the database, so neither ever loads the full history.
+
+DONATION_FIELDS = [
+    'id', 'date_donated', 'item_name', 'category',
+    'charity_name', 'impact_score', 'user_id'
+]
+
+
+def _parse_date(value, name):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise ValueError(f"'{name}' must be a date like 2024-01-31")
+
+
+def donation_filters(args):
+    """
+    WHERE clauses for ?from=YYYY-MM-DD&to=YYYY-MM-DD&charity=...&category=...
+    Both dates are inclusive. Raises ValueError on a malformed date.
+    """
+    from rewear_ai.wardrobe.models import DonationRecord
+
+    clauses = []
+    if args.get('from'):
+        clauses.append(DonationRecord.date_donated >= _parse_date(args['from'], 'from'))
+    if args.get('to'):
+        end = _parse_date(args['to'], 'to') + timedelta(days=1)
+        clauses.append(DonationRecord.date_donated < end)
+    if args.get('charity'):
+        clauses.append(DonationRecord.charity_name == args['charity'])
+    if args.get('category'):
+        clauses.append(DonationRecord.category == args['category'])
+    return clauses
+
+
+def donation_rows(clauses):
+    """Select for the export, oldest first (walks the date_donated index)."""
+    from rewear_ai.wardrobe.models import DonationRecord
+
+    columns = [getattr(DonationRecord, f) for f in DONATION_FIELDS]
+    return (
+        select(*columns)
+        .where(*clauses)
+        .order_by(DonationRecord.date_donated, DonationRecord.id)
+    )
+
+
+def _month(column):
+    """'YYYY-MM' for a timestamp column, in the database's own dialect."""
+    if db.engine.dialect.name == 'postgresql':
+        return func.to_char(column, 'YYYY-MM')
+    return func.strftime('%Y-%m', column)
+
+
+def donation_totals(clauses, by):
+    """
+    Per-charity or per-month totals computed with GROUP BY.
+    Returns a list of {"charity"|"month", "donations", "impact_score"}.
+    """
+    from rewear_ai.wardrobe.models import DonationRecord
+
+    if by == 'charity':
+        key = DonationRecord.charity_name
+    elif by == 'month':
+        key = _month(DonationRecord.date_donated)
+    else:
+        raise ValueError("'by' must be charity or month")
+
+    key = key.label(by)
+    stmt = (
+        select(
+            key,
+            func.count(DonationRecord.id).label('donations'),
+            func.coalesce(func.sum(DonationRecord.impact_score), 0).label('impact_score'),
+        )
+        .where(*clauses)
+        .group_by(key)
+        .order_by(key)
+    )
+    return [dict(row._mapping) for row in db.session.execute(stmt)]
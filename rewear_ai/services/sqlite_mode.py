@@ -0,0 +1,123 @@
+import os
+import threading
+from sqlalchemy import event
+from sqlalchemy.schema import ExecutableDDLElement
+from sqlalchemy.sql.elements import TextClause
+
+# Production settings for the local SQLite fallback:
+#  * every connection gets WAL journaling, synchronous=NORMAL, a busy timeout
+#    and larger mmap/page caches;
+#  * reads run outside any transaction (each sees the latest commit, like
+#    READ COMMITTED on PostgreSQL), and the first write of a transaction - DML,
+#    DDL, a SAVEPOINT or a SELECT ... FOR UPDATE - opens it with BEGIN IMMEDIATE.
+#    A deferred read transaction that later writes fails straight away with
+#    "database is locked" when another writer got in first; taking the write
+#    lock before holding any snapshot lets busy_timeout queue writers instead.
+#    Inside a worker, writers also take a process-wide lock so threads line up
+#    in order rather than spinning. Slow work done before the first write
+#    (password hashing, Gemini calls) holds no lock at all;
+#  * a second, read-only engine (bind 'sqlite_ro') serves routes marked with
+#    @read_only, which never block on or take the write lock.
+
+READ_BIND = 'sqlite_ro'
+
+SQLITE_DEFAULTS = {
+    'SQLITE_BUSY_TIMEOUT_MS': 5000,
+    'SQLITE_MMAP_SIZE': 256 * 1024 * 1024,
+    'SQLITE_CACHE_SIZE': -64000,       # negative = KiB, i.e. 64MB per connection
+}
+
+WRITE_PREFIXES = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'CREATE', 'DROP', 'ALTER')
+
+_writer_lock = threading.Lock()
+
+
+def configure(app, db_path):
+    """Sets engine options and the read-only bind. Call before db.init_app."""
+    for key, default in SQLITE_DEFAULTS.items():
+        app.config.setdefault(key, int(os.getenv(key, default)))
+
+    timeout = app.config['SQLITE_BUSY_TIMEOUT_MS'] / 1000
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {}).setdefault(
+        'connect_args', {'timeout': timeout, 'check_same_thread': False}
+    )
+    binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+    binds[READ_BIND] = {
+        'url': f'sqlite:///file:{db_path}?mode=ro&uri=true',
+        'connect_args': {'timeout': timeout, 'check_same_thread': False, 'uri': True},
+    }
+    app.config['SQLALCHEMY_READ_BIND'] = READ_BIND
+
+
+def _apply_pragmas(dbapi_conn, config, read_only):
+    cursor = dbapi_conn.cursor()
+    if not read_only:
+        cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={config['SQLITE_BUSY_TIMEOUT_MS']}")
+    cursor.execute(f"PRAGMA mmap_size={config['SQLITE_MMAP_SIZE']}")
+    cursor.execute(f"PRAGMA cache_size={config['SQLITE_CACHE_SIZE']}")
+    if read_only:
+        cursor.execute("PRAGMA query_only=1")
+    cursor.close()
+
+
+def _is_write(statement):
+    if isinstance(statement, str):
+        return statement.lstrip().upper().startswith(WRITE_PREFIXES)
+    if isinstance(statement, TextClause):
+        return _is_write(statement.text)
+    if isinstance(statement, ExecutableDDLElement) or getattr(statement, 'is_dml', False):
+        return True
+    # SELECT ... FOR UPDATE: the caller is about to write what it reads
+    return getattr(statement, '_for_update_arg', None) is not None
+
+
+def install(app, db):
+    """Hooks the writer and reader engines. Call after db.init_app."""
+    config = app.config
+    timeout = config['SQLITE_BUSY_TIMEOUT_MS'] / 1000
+
+    with app.app_context():
+        writer = db.engine
+        reader = db.engines[READ_BIND]
+
+    @event.listens_for(writer, 'connect')
+    def on_writer_connect(dbapi_conn, record):
+        _apply_pragmas(dbapi_conn, config, read_only=False)
+        # Autocommit at the driver: BEGIN is issued by begin_write() only
+        dbapi_conn.isolation_level = None
+
+    def begin_write(conn):
+        if conn.info.get('write_txn'):
+            return
+        conn.info['write_txn'] = True
+        if _writer_lock.acquire(timeout=timeout):
+            conn.info['holds_writer_lock'] = True
+        try:
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+        except Exception:
+            release(conn)
+            raise
+
+    @event.listens_for(writer, 'before_execute')
+    def on_writer_execute(conn, statement, *args):
+        if _is_write(statement):
+            begin_write(conn)
+
+    @event.listens_for(writer, 'savepoint')
+    def on_writer_savepoint(conn, name):
+        # A SAVEPOINT outside a transaction would open a deferred one
+        begin_write(conn)
+
+    def release(conn, *args):
+        conn.info.pop('write_txn', None)
+        if conn.info.pop('holds_writer_lock', False):
+            _writer_lock.release()
+
+    event.listen(writer, 'commit', release)
+    event.listen(writer, 'rollback', release)
+
+    @event.listens_for(reader, 'connect')
+    def on_reader_connect(dbapi_conn, record):
+        _apply_pragmas(dbapi_conn, config, read_only=True)
@@ -0,0 +1,168 @@
+from collections import Counter
+import click
+from sqlalchemy import select, func
+from sqlalchemy.exc import IntegrityError
+from rewear_ai.app import db
+
+# Incremental upkeep of the user_stats rollup. Callers pass what changed and
+# commit as usual, so the rollup moves in the same transaction as the rows it
+# summarises. rebuild() recomputes everything from the source tables.
+
+
+def _field(obj, name):
+    if isinstance(obj, dict):
+        return obj.get(name)
+    if hasattr(obj, '_mapping'):
+        # Result rows: go through the mapping so names like `count` don't hit tuple methods
+        return obj._mapping.get(name)
+    return getattr(obj, name, None)
+
+
+def _seed_row(user_id):
+    """
+    Creates a missing rollup from the source tables. Callers make their
+    change before record(), so the seed already includes it. Returns False
+    when another request created the row first.
+    """
+    try:
+        with db.session.begin_nested():
+            _rebuild_chunk([user_id])
+        return True
+    except IntegrityError:
+        return False
+
+
+def _shift(counts, key, delta):
+    counts = dict(counts or {})
+    if key:
+        counts[key] = counts.get(key, 0) + delta
+        if counts[key] <= 0:
+            del counts[key]
+    return counts
+
+
+def record(user_id, items_added=(), items_removed=(), wears=0, donations=0, impact=0):
+    """
+    Applies a change to a user's rollup. `items_added` / `items_removed` are
+    ClothingItems, rows or dicts with category, season and times_worn (dicts
+    may also carry a `count` to stand for several identical items).
+    Make the change in the session first: a user without a rollup yet (e.g.
+    one from before user_stats existed) gets it seeded from the tables.
+    """
+    from rewear_ai.wardrobe.models import UserStats
+
+    row = db.session.get(UserStats, user_id, with_for_update=True)
+    if row is None:
+        if _seed_row(user_id):
+            return
+        row = db.session.get(UserStats, user_id, with_for_update=True, populate_existing=True)
+    categories = row.items_by_category
+    seasons = row.items_by_season
+    total_wears = row.total_wears or 0
+    item_count = row.item_count or 0
+
+    for sign, items in ((1, items_added), (-1, items_removed)):
+        for item in items:
+            # Pre-aggregated entries carry a count and summed times_worn
+            n = sign * (_field(item, 'count') or 1)
+            item_count += n
+            total_wears += sign * (_field(item, 'times_worn') or 0)
+            categories = _shift(categories, _field(item, 'category'), n)
+            seasons = _shift(seasons, _field(item, 'season'), n)
+
+    # Reassign rather than mutate so the JSON columns are flagged dirty
+    row.items_by_category = categories
+    row.items_by_season = seasons
+    row.item_count = item_count
+    row.total_wears = total_wears + wears
+    row.donation_count = (row.donation_count or 0) + donations
+    row.impact_score = (row.impact_score or 0) + impact
+
+
+def stats_for(user_id):
+    """
+    The user's rollup via one primary-key lookup. Users without one yet get
+    an unsaved rollup computed from the tables (read-only routes call this).
+    """
+    from rewear_ai.wardrobe.models import UserStats
+    return db.session.get(UserStats, user_id) or UserStats(
+        user_id=user_id, **_compute([user_id])[user_id]
+    )
+
+
+def rebuild(user_ids=None, chunk_size=500):
+    """Recomputes rollups from clothing_items and donation_records."""
+    from rewear_ai.wardrobe.models import User
+
+    if user_ids is None:
+        user_ids = db.session.execute(select(User.id).order_by(User.id)).scalars().all()
+    user_ids = list(user_ids)
+
+    for start in range(0, len(user_ids), chunk_size):
+        _rebuild_chunk(user_ids[start:start + chunk_size])
+        db.session.commit()
+    return len(user_ids)
+
+
+def _compute(user_ids):
+    """UserStats column values per user, aggregated from the source tables."""
+    from rewear_ai.wardrobe.models import ClothingItem, DonationRecord
+
+    fresh = {uid: {"total_wears": 0, "item_count": 0, "categories": Counter(),
+                   "seasons": Counter(), "donation_count": 0, "impact_score": 0}
+             for uid in user_ids}
+
+    for uid, category, season, count, wears in db.session.execute(
+        select(ClothingItem.user_id, ClothingItem.category, ClothingItem.season,
+               func.count(ClothingItem.id), func.coalesce(func.sum(ClothingItem.times_worn), 0))
+        .where(ClothingItem.user_id.in_(user_ids))
+        .group_by(ClothingItem.user_id, ClothingItem.category, ClothingItem.season)
+    ):
+        entry = fresh[uid]
+        entry["item_count"] += count
+        entry["total_wears"] += wears
+        entry["categories"][category] += count
+        entry["seasons"][season] += count
+
+    for uid, count, impact in db.session.execute(
+        select(DonationRecord.user_id, func.count(DonationRecord.id),
+               func.coalesce(func.sum(DonationRecord.impact_score), 0))
+        .where(DonationRecord.user_id.in_(user_ids))
+        .group_by(DonationRecord.user_id)
+    ):
+        fresh[uid]["donation_count"] = count
+        fresh[uid]["impact_score"] = impact
+
+    return {
+        uid: {
+            "total_wears": entry["total_wears"],
+            "item_count": entry["item_count"],
+            "items_by_category": dict(entry["categories"]),
+            "items_by_season": dict(entry["seasons"]),
+            "donation_count": entry["donation_count"],
+            "impact_score": entry["impact_score"],
+        }
+        for uid, entry in fresh.items()
+    }
+
+
+def _rebuild_chunk(user_ids):
+    from rewear_ai.wardrobe.models import UserStats
+
+    for uid, values in _compute(user_ids).items():
+        row = db.session.get(UserStats, uid) or UserStats(user_id=uid)
+        for column, value in values.items():
+            setattr(row, column, value)
+        db.session.add(row)
+
+
+@click.command('rebuild-stats')
+@click.option('--user', 'user_ids', type=int, multiple=True, help='Only these user ids.')
+def rebuild_stats(user_ids):
+    """Reconciles user_stats with the source tables."""
+    count = rebuild(user_ids or None)
+    click.echo(f"Rebuilt stats for {count} users.")
+
+
+def init_app(app):
+    app.cli.add_command(rebuild_stats)
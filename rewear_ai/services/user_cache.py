@@ -0,0 +1,78 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from flask_login import UserMixin
+
+# Per-worker cache of who is logged in, so rebuilding current_user does not
+# cost a query on every request.
+#
+# The cache is not shared: a password change or role change invalidates the
+# entry (and bumps auth_version) only in the worker that made it. Other
+# workers keep serving their cached copy - whose auth_version still equals
+# the session stamp - until it expires. So a revoked session or demoted admin
+# can keep working for up to USER_CACHE_TTL seconds on other workers; keep
+# the TTL short. Once an entry expires, the stamp check against the users
+# row rejects the stale session everywhere.
+USER_CACHE_TTL = float(os.getenv('USER_CACHE_TTL', '5'))
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', '10000'))
+
+
+class CachedUser(UserMixin):
+    """Lightweight stand-in for User carrying only identity and role."""
+
+    def __init__(self, id, username, email, role, auth_version):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.role = role
+        self.auth_version = auth_version
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(user.id, user.username, user.email, user.role, user.auth_version or 0)
+
+    @property
+    def is_admin(self):
+        return self.role == 'admin'
+
+    def __repr__(self):
+        return f"<CachedUser {self.username}>"
+
+
+class UserCache:
+    def __init__(self, ttl=USER_CACHE_TTL, max_size=USER_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            user, expires = entry
+            if expires < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return user
+
+    def put(self, user):
+        with self._lock:
+            self._entries[user.id] = (user, time.monotonic() + self.ttl)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache()
@@ -3,6 +3,7 @@ from PIL import Image
 import json
 import os
 from dotenv import load_dotenv
+from rewear_ai.services.admission import admit_ai_call
 
 # Load the variables from your .env file
 load_dotenv()
@@ -11,9 +12,18 @@ load_dotenv()
 api_key = os.getenv("GEMINI_API_KEY")
 genai.configure(api_key=api_key)
 
-def analyze_clothing_image(image_path):
+# Served whenever the model can't be reached (errors or admission control)
+FALLBACK_ANALYSIS = {
+    "category": "Clothing", 
+    "color": "Unknown", 
+    "celeb_twin": "Vibe Detected", 
+    "styling_tip": "Keep it simple and let the item speak for itself."
+}
+
+def analyze_clothing_image(image_path, user_key=None):
     """
     AI Vision analysis using the secure GEMINI_API_KEY from .env.
+    Calls go through admission control; when over quota the fallback is returned.
     """
     if not api_key:
         print("ERROR: GEMINI_API_KEY not found in environment or .env file.")
@@ -24,6 +34,10 @@ def analyze_clothing_image(image_path):
             "styling_tip": "Check your .env file."
         }
 
+    if not admit_ai_call(user_key):
+        print("AI Vision skipped: admission control")
+        return dict(FALLBACK_ANALYSIS)
+
     model = genai.GenerativeModel('gemini-1.5-flash')
     try:
         img = Image.open(image_path)
@@ -57,9 +71,4 @@ def analyze_clothing_image(image_path):
         
     except Exception as e:
         print(f"AI Vision Error: {e}")
-        return {
-            "category": "Clothing", 
-            "color": "Unknown", 
-            "celeb_twin": "Vibe Detected", 
-            "styling_tip": "Keep it simple and let the item speak for itself."
-        }
\ No newline at end of file
+        return dict(FALLBACK_ANALYSIS)
\ No newline at end of file
@@ -3,11 +3,25 @@ import json
 import urllib.parse
 import google.generativeai as genai
 from flask import Blueprint, render_template, request, flash, redirect, url_for
+from flask_login import current_user
 from rewear_ai.wardrobe.models import ClothingItem
 from rewear_ai.app import db
+from rewear_ai.services.admission import admit_ai_call
 
 upcycle = Blueprint('upcycle', __name__, template_folder='templates')
 
+# Robust fallback if AI or JSON parsing fails, or the call isn't admitted
+FALLBACK_RECIPE = {
+    "project_name": "Custom Style Transformation",
+    "difficulty": "Medium",
+    "steps": [
+        "Evaluate the current condition of the fabric.",
+        "Mark out a new pattern based on your needs.",
+        "Carefully cut and sew edges to prevent fraying.",
+        "Add personal embellishments for a unique finish."
+    ]
+}
+
 @upcycle.route('/item/<int:item_id>')
 def upcycle_item(item_id):
     # Fetch the specific item from the database
@@ -30,24 +44,21 @@ def upcycle_item(item_id):
     }}
     """
     
-    try:
-        response = model.generate_content(prompt)
-        # Clean potential markdown formatting from AI response
-        clean_json = response.text.replace('```json', '').replace('```', '').strip()
-        recipe = json.loads(clean_json)
-    except Exception as e:
-        print(f"Upcycle AI Error: {e}")
-        # Robust fallback if AI or JSON parsing fails
-        recipe = {
-            "project_name": "Custom Style Transformation",
-            "difficulty": "Medium",
-            "steps": [
-                "Evaluate the current condition of the fabric.",
-                "Mark out a new pattern based on your needs.",
-                "Carefully cut and sew edges to prevent fraying.",
-                "Add personal embellishments for a unique finish."
-            ]
-        }
+    # Anonymous visitors share a bucket per address
+    user_key = current_user.id if current_user.is_authenticated else request.remote_addr
+
+    if not admit_ai_call(user_key):
+        print("Upcycle AI skipped: admission control")
+        recipe = FALLBACK_RECIPE
+    else:
+        try:
+            response = model.generate_content(prompt)
+            # Clean potential markdown formatting from AI response
+            clean_json = response.text.replace('```json', '').replace('```', '').strip()
+            recipe = json.loads(clean_json)
+        except Exception as e:
+            print(f"Upcycle AI Error: {e}")
+            recipe = FALLBACK_RECIPE
 
     # Generate the Dynamic YouTube Search Link
     yt_query = f"DIY upcycle {item.category} into {recipe['project_name']} tutorial"
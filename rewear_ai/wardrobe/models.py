@@ -1,7 +1,7 @@
 from datetime import datetime
 from rewear_ai.app import db
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from rewear_ai.services import passwords
 
 class User(db.Model, UserMixin):
     __tablename__ = 'users'
@@ -15,20 +15,47 @@ class User(db.Model, UserMixin):
     # ROLE SYSTEM: 'user' for members, 'admin' for you
     role = db.Column(db.String(20), default='user') 
 
+    # Bumped whenever the password or role changes; sessions stamped with an
+    # older value are rejected and cached logins are refreshed
+    auth_version = db.Column(db.Integer, default=0, nullable=False)
+
+    # Bumped in the same transaction as any change to the user's closet;
+    # keys the rendered wardrobe fragments
+    wardrobe_version = db.Column(db.Integer, default=0, nullable=False)
+
     # Relationships: Links clothes and donations to specific users
     items = db.relationship('ClothingItem', backref='owner', lazy=True)
     donations = db.relationship('DonationRecord', backref='donator', lazy=True)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = passwords.hash_password(password)
+        self._bump_auth_version()
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return passwords.verify_password(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        return passwords.needs_rehash(self.password_hash)
+
+    def rehash_password(self, password):
+        # Same password, current policy: existing sessions stay valid
+        self.password_hash = passwords.hash_password(password)
+
+    def _bump_auth_version(self):
+        self.auth_version = (self.auth_version or 0) + 1
+        if self.id is not None:
+            from rewear_ai.services.user_cache import user_cache
+            user_cache.invalidate(self.id)
 
     @property
     def is_admin(self):
         return self.role == 'admin'
 
+@db.event.listens_for(User.role, 'set')
+def _role_changed(target, value, oldvalue, initiator):
+    if value != oldvalue:
+        target._bump_auth_version()
+
 class ClothingItem(db.Model):
     __tablename__ = 'clothing_items'
 
@@ -47,6 +74,9 @@ class ClothingItem(db.Model):
     # db.Text allows for long, detailed AI styling advice without crashing
     styling_tip = db.Column(db.Text, nullable=True) 
 
+    # Packed float32 color histogram + thumbnail embedding (services/features.py)
+    feature_vector = db.Column(db.LargeBinary, nullable=True)
+
     # --- USER RELATIONSHIP ---
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
 
@@ -63,6 +93,15 @@ class Charity(db.Model):
     lat = db.Column(db.Float)
     lon = db.Column(db.Float)
 
+    # 'partner' rows are added by admins; 'osm' rows come from `flask ingest-osm`
+    source = db.Column(db.String(20), default='partner', nullable=False, index=True)
+    osm_id = db.Column(db.BigInteger, unique=True, nullable=True)
+    kind = db.Column(db.String(100), nullable=True)
+    # Coarse grid cell (services/osm.py) so nearby lookups hit an index
+    geo_bucket = db.Column(db.Integer, nullable=True, index=True)
+    # Time of the ingest run that last wrote an OSM row (feeds the nearby ETag)
+    ingested_at = db.Column(db.DateTime, nullable=True, index=True)
+
     def to_dict(self):
         return {
             "name": self.name,
@@ -78,9 +117,57 @@ class DonationRecord(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     item_name = db.Column(db.String(100))
     category = db.Column(db.String(50))
-    charity_name = db.Column(db.String(100))
-    date_donated = db.Column(db.DateTime, default=datetime.utcnow)
+    charity_name = db.Column(db.String(100), index=True)
+    date_donated = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     impact_score = db.Column(db.Integer, default=10)
     
     # Track who donated it for the leaderboard
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
\ No newline at end of file
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+
+class UserStats(db.Model):
+    """
+    Per-user sustainability rollup, kept current by the same transactions
+    that change wardrobes and donations (see services/stats.py).
+    """
+    __tablename__ = 'user_stats'
+
+    # Rough CO2 avoided each time a garment is re-worn instead of bought new
+    CO2_PER_WEAR_KG = 0.5
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    total_wears = db.Column(db.Integer, default=0, nullable=False)
+    item_count = db.Column(db.Integer, default=0, nullable=False)
+    items_by_category = db.Column(db.JSON, default=dict, nullable=False)
+    items_by_season = db.Column(db.JSON, default=dict, nullable=False)
+    donation_count = db.Column(db.Integer, default=0, nullable=False)
+    impact_score = db.Column(db.Integer, default=0, nullable=False)
+
+    @property
+    def co2_saved(self):
+        return round((self.total_wears or 0) * self.CO2_PER_WEAR_KG, 1)
+
+    def to_dict(self):
+        return {
+            "total_wears": self.total_wears or 0,
+            "co2_saved": self.co2_saved,
+            "item_count": self.item_count or 0,
+            "items_by_category": self.items_by_category or {},
+            "items_by_season": self.items_by_season or {},
+            "donation_count": self.donation_count or 0,
+            "impact_score": self.impact_score or 0,
+        }
+
+class OutfitSuggestion(db.Model):
+    """
+    Ranked outfits precomputed per user, occasion and temperature band.
+    `outfits` is a list of [top_id, bottom_id, shoes_id, outerwear_id|null];
+    `cursor` rotates through it. Valid while wardrobe_version matches the user's.
+    """
+    __tablename__ = 'outfit_suggestions'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    occasion = db.Column(db.String(50), primary_key=True)
+    temp_band = db.Column(db.String(10), primary_key=True)
+    wardrobe_version = db.Column(db.Integer, nullable=False)
+    cursor = db.Column(db.Integer, default=0, nullable=False)
+    outfits = db.Column(db.JSON, default=list, nullable=False)
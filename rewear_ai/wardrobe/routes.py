@@ -1,13 +1,19 @@
 import os
+import json
+from markupsafe import Markup
 from flask import (
     Blueprint, render_template, request, redirect, 
-    url_for, flash, current_app
+    url_for, flash, current_app, jsonify, Response, stream_with_context
 )
 from flask_login import login_required, current_user
+from sqlalchemy import select
 from werkzeug.utils import secure_filename
 from rewear_ai.wardrobe.models import ClothingItem
 from rewear_ai.app import db
 from rewear_ai.services.vision import analyze_clothing_image 
+from rewear_ai.services import bulk, fragment_cache, stats, features
+from rewear_ai.services.conditional import conditional, make_etag
+from rewear_ai.services.db_routing import read_only
 
 wardrobe = Blueprint(
     'wardrobe',
@@ -15,36 +21,100 @@ wardrobe = Blueprint(
     template_folder='templates'
 )
 
+# Columns that travel through bulk export/import (id and owner are server-side)
+TRANSFER_FIELDS = [
+    'name', 'category', 'color', 'season', 'occasion',
+    'image_file', 'times_worn', 'celeb_twin', 'styling_tip'
+]
+TRANSFER_FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+# Photos can't travel in an import (and exported names may belong to other
+# items), so imported items always start with the placeholder image
+IMPORT_FIELDS = [f for f in TRANSFER_FIELDS if f != 'image_file']
+# Import reports at most this many bad rows back to the client
+MAX_REPORTED_ERRORS = 20
+
+def remove_upload(image_file):
+    """Deletes an item's uploaded photo, leaving the shared placeholder alone."""
+    if not image_file or image_file == 'default.jpg':
+        return
+    upload_dir = os.path.realpath(os.path.join(current_app.static_folder, 'uploads'))
+    file_path = os.path.realpath(os.path.join(upload_dir, image_file))
+    if os.path.dirname(file_path) != upload_dir:
+        print(f"Refusing to delete file outside uploads: {image_file}")
+        return
+    if os.path.exists(file_path):
+        os.remove(file_path)
+
+def _wardrobe_etag(**kwargs):
+    # Any change to the closet (or to the user's login) bumps one of these
+    return make_etag(
+        request.endpoint, current_user.id, current_user.auth_version,
+        fragment_cache.wardrobe_version(current_user.id),
+        request.query_string.decode(), *kwargs.values()
+    )
+
 # 📌 VIEW ALL & SEARCH
 @wardrobe.route('/')
+@read_only
 @login_required
+@conditional(_wardrobe_etag)
 def index():
     search_query = request.args.get('q', '')
     category_filter = request.args.get('cat', '')
-    
-    query = ClothingItem.query.filter_by(user_id=current_user.id)
 
-    if search_query:
-        query = query.filter(ClothingItem.name.contains(search_query))
-    if category_filter:
-        query = query.filter_by(category=category_filter)
+    # The grid only changes when the wardrobe version does, so an unchanged
+    # closet is served without loading items or rendering cards
+    version = fragment_cache.wardrobe_version(current_user.id)
+    key = fragment_cache.fragment_key('wardrobe-grid', current_user.id, version,
+                                      search_query, category_filter)
+    cached = fragment_cache.get(key)
+
+    if cached is not None:
+        fragment = json.loads(cached)
+    else:
+        query = ClothingItem.query.filter_by(user_id=current_user.id)
+
+        if search_query:
+            query = query.filter(ClothingItem.name.contains(search_query))
+        if category_filter:
+            query = query.filter_by(category=category_filter)
+
+        items = query.all()
+
+        fragment = {
+            "grid": render_template('wardrobe/_grid.html', items=items),
+            "item_count": len(items),
+        }
+        fragment_cache.put(key, json.dumps(fragment))
+
+    user_stats = stats.stats_for(current_user.id)
 
-    items = query.all()
-    
-    total_wears = sum(item.times_worn for item in items)
-    co2_saved = round(total_wears * 0.5, 1)
-    
     return render_template('wardrobe/index.html', 
-                            items=items, 
-                            co2_saved=co2_saved, 
-                            total_wears=total_wears)
+                            grid=Markup(fragment['grid']),
+                            item_count=fragment['item_count'],
+                            co2_saved=user_stats.co2_saved, 
+                            total_wears=user_stats.total_wears)
 
 # 📌 VIEW SINGLE ITEM
 @wardrobe.route('/item/<int:id>')
+@read_only
 @login_required
+@conditional(_wardrobe_etag)
 def detail(id):
     item = ClothingItem.query.filter_by(id=id, user_id=current_user.id).first_or_404()
-    return render_template('wardrobe/detail.html', item=item)
+
+    # 👯 Look-alikes from the in-memory per-user index
+    matches = features.similar_items(current_user.id, item.feature_vector, exclude_id=item.id)
+    similar = []
+    if matches:
+        found = {i.id: i for i in ClothingItem.query.filter(
+            ClothingItem.id.in_([item_id for item_id, _ in matches]))}
+        similar = [found[item_id] for item_id, _ in matches if item_id in found]
+
+    return render_template('wardrobe/detail.html', item=item, similar=similar)
 
 # 📌 ADD ITEM
 @wardrobe.route('/add', methods=['GET', 'POST'])
@@ -64,6 +134,8 @@ def add():
     
     celeb_twin = "Style Icon"
     styling_tip = "Pair with neutral tones for a balanced look."
+    feature_vector = None
+    duplicate_id = None
     
     if file and file.filename != '':
         filename = secure_filename(file.filename)
@@ -74,7 +146,10 @@ def add():
         saved_path = os.path.join(upload_path, filename)
         file.save(saved_path)
 
-        ai_results = analyze_clothing_image(saved_path)
+        feature_vector = features.extract_features(saved_path)
+        duplicate_id = features.find_duplicate(current_user.id, feature_vector)
+
+        ai_results = analyze_clothing_image(saved_path, user_key=current_user.id)
         if ai_results:
             category = category or ai_results.get('category')
             color = color or ai_results.get('color')
@@ -94,12 +169,20 @@ def add():
         image_file=filename,
         celeb_twin=celeb_twin,
         styling_tip=styling_tip,
+        feature_vector=feature_vector,
         user_id=current_user.id
     )
 
     db.session.add(item)
+    stats.record(current_user.id, items_added=[item])
+    fragment_cache.bump_wardrobe_version(current_user.id)
     db.session.commit()
     flash(f"Success! Gemini matched this to {celeb_twin}'s style.")
+
+    if duplicate_id:
+        twin = db.session.get(ClothingItem, duplicate_id)
+        if twin:
+            flash(f"Heads up: this looks a lot like your \"{twin.name}\". Already own it?", 'warning')
     return redirect(url_for('wardrobe.index'))
 
 # 📌 EDIT ITEM (With Integrity Error Protection)
@@ -109,6 +192,8 @@ def edit(id):
     item = ClothingItem.query.filter_by(id=id, user_id=current_user.id).first_or_404()
     
     if request.method == 'POST':
+        before = {"category": item.category, "season": item.season, "times_worn": item.times_worn}
+
         # Safety Logic: Use 'or item.x' so if form is blank, it doesn't save as NULL
         item.name = request.form.get('name') or item.name
         item.category = request.form.get('category') or item.category
@@ -119,10 +204,14 @@ def edit(id):
         file = request.files.get('image')
         if file and file.filename != '':
             filename = secure_filename(file.filename)
-            file.save(os.path.join(current_app.static_folder, 'uploads', filename))
+            saved_path = os.path.join(current_app.static_folder, 'uploads', filename)
+            file.save(saved_path)
             item.image_file = filename
+            item.feature_vector = features.extract_features(saved_path)
             
         try:
+            stats.record(current_user.id, items_added=[item], items_removed=[before])
+            fragment_cache.bump_wardrobe_version(current_user.id)
             db.session.commit()
             flash('Item updated successfully!', 'success')
             return redirect(url_for('wardrobe.detail', id=item.id))
@@ -137,12 +226,108 @@ def edit(id):
 @login_required
 def delete(id):
     item = ClothingItem.query.filter_by(id=id, user_id=current_user.id).first_or_404()
-    if item.image_file and item.image_file != 'default.jpg':
-        file_path = os.path.join(current_app.static_folder, 'uploads', item.image_file)
-        if os.path.exists(file_path):
-            os.remove(file_path)
+    remove_upload(item.image_file)
 
     db.session.delete(item)
+    stats.record(current_user.id, items_removed=[item])
+    fragment_cache.bump_wardrobe_version(current_user.id)
     db.session.commit()
     flash('Item removed', 'success')
-    return redirect(url_for('wardrobe.index'))
\ No newline at end of file
+    return redirect(url_for('wardrobe.index'))
+
+# 📌 BULK EXPORT (streams CSV / JSONL, admins may export every wardrobe)
+@wardrobe.route('/export.<fmt>')
+@read_only
+@login_required
+def export_items(fmt):
+    if fmt not in TRANSFER_FORMATS:
+        return jsonify({"error": "Format must be csv or jsonl"}), 400
+
+    fields = ['id'] + TRANSFER_FIELDS
+    stmt = select(*[getattr(ClothingItem, f) for f in fields]).order_by(ClothingItem.id)
+
+    if request.args.get('scope') == 'all' and current_user.is_admin:
+        fields.append('user_id')
+        stmt = stmt.add_columns(ClothingItem.user_id)
+    else:
+        stmt = stmt.where(ClothingItem.user_id == current_user.id)
+
+    rows = bulk.stream_rows(stmt, fields)
+    body = bulk.to_csv(rows, fields) if fmt == 'csv' else bulk.to_jsonl(rows)
+
+    return Response(
+        stream_with_context(body),
+        mimetype=TRANSFER_FORMATS[fmt],
+        headers={"Content-Disposition": f"attachment; filename=wardrobe.{fmt}"}
+    )
+
+# 📌 BULK IMPORT (streams CSV / JSONL into the current user's wardrobe)
+@wardrobe.route('/import', methods=['POST'])
+@login_required
+def import_items():
+    upload = request.files.get('file')
+    if upload:
+        stream = upload.stream
+        fmt = request.args.get('format') or upload.filename.rsplit('.', 1)[-1].lower()
+    else:
+        stream = request.stream
+        fmt = request.args.get('format', 'jsonl')
+
+    if fmt not in TRANSFER_FORMATS:
+        return jsonify({"error": "Format must be csv or jsonl"}), 400
+
+    limits = bulk.column_limits(ClothingItem, IMPORT_FIELDS)
+    required = bulk.required_fields(ClothingItem, IMPORT_FIELDS)
+    errors = []
+    skipped = 0
+    # (category, season) -> count and summed wears, for the stats rollup
+    tally = {}
+
+    def valid_rows():
+        nonlocal skipped
+        parser = bulk.parse_csv if fmt == 'csv' else bulk.parse_jsonl
+        for line_no, raw in enumerate(parser(stream), start=1):
+            if not isinstance(raw, dict):
+                row, error = None, "row is not an object"
+            else:
+                row, error = bulk.clean_row(
+                    raw, IMPORT_FIELDS, limits, required,
+                    integer_fields=('times_worn',)
+                )
+            if error:
+                skipped += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({"row": line_no, "error": error})
+                continue
+            row['user_id'] = current_user.id
+            row['image_file'] = 'default.jpg'
+            entry = tally.setdefault((row['category'], row['season']), [0, 0])
+            entry[0] += 1
+            entry[1] += row.get('times_worn', 0)
+            yield row
+
+    try:
+        imported = bulk.bulk_insert(ClothingItem, valid_rows())
+        if imported:
+            stats.record(current_user.id, items_added=[
+                {"category": category, "season": season, "count": count, "times_worn": wears}
+                for (category, season), (count, wears) in tally.items()
+            ])
+            fragment_cache.bump_wardrobe_version(current_user.id)
+        db.session.commit()
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({"error": f"Could not parse upload: {e}"}), 400
+    except Exception as e:
+        db.session.rollback()
+        print(f"Import Error: {e}")
+        return jsonify({"error": "Import failed, nothing was saved."}), 500
+
+    return jsonify({"imported": imported, "skipped": skipped, "errors": errors})
+
+# 📌 SUSTAINABILITY STATS (single lookup on the per-user rollup)
+@wardrobe.route('/api/stats')
+@read_only
+@login_required
+def stats_api():
+    return jsonify(stats.stats_for(current_user.id).to_dict())